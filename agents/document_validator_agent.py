@@ -167,6 +167,64 @@ Return JSON in this exact format:
         
         return result
     
+    def validate_template_fields(self, extracted_data: Dict[str, str], filename: str) -> Dict[str, Any]:
+        """
+        Validate fields already mapped from a layout template (no LLM call)
+        
+        Args:
+            extracted_data: Field values read from the template's field regions
+            filename: Original document filename
+            
+        Returns:
+            Dictionary with validation results (same shape as validate_and_extract)
+        """
+        result = self.validate_mapped_fields(extracted_data, filename, 'layout_template')
+        logger.info(f"Template extraction for {filename}")
+        logger.info(f"  Extracted data: {result['extracted_data']}")
+        logger.info(f"  Missing mandatory fields: {result['missing_fields']}")
+        return result
+    
+    def validate_spreadsheet_record(self, extracted_data: Dict[str, str], filename: str,
+                                    record_id: str) -> Dict[str, Any]:
+        """
+        Validate one spreadsheet row already mapped to mandatory fields by its headers (no LLM call)
+        
+        Args:
+            extracted_data: Field values of the row
+            filename: Source spreadsheet
+            record_id: Sheet/row identifier, e.g. 'Plans_row12'
+            
+        Returns:
+            Dictionary with validation results (same shape as validate_and_extract) plus record_id
+        """
+        result = self.validate_mapped_fields(extracted_data, filename, 'spreadsheet_row')
+        result['record_id'] = record_id
+        status = "complete" if result['all_fields_present'] else f"missing {', '.join(result['missing_fields'])}"
+        logger.info(f"  {record_id}: {status}")
+        return result
+    
+    def validate_mapped_fields(self, extracted_data: Dict[str, str], filename: str,
+                               extraction_method: str) -> Dict[str, Any]:
+        """Validation result for field values that were mapped without the LLM"""
+        # Every mapped field is kept (like the LLM path); plan_id is carried even when
+        # not configured as mandatory (retry registry, exports)
+        fields = self.mandatory_fields + [f for f in ['plan_id'] if f not in self.mandatory_fields]
+        data = {field: str(value or "").strip() for field, value in extracted_data.items()}
+        for field in fields:
+            data.setdefault(field, "")
+        missing_fields = [field for field in self.mandatory_fields if not data[field]]
+        plan_id = data.get('plan_id', '')
+        
+        return {
+            'filename': filename,
+            'extracted_data': data,
+            'missing_fields': missing_fields,
+            'all_fields_present': len(missing_fields) == 0,
+            'error_type': None,
+            'plan_id_from_pdf': plan_id or None,
+            'extraction_method': extraction_method
+        }
+    
     def save_validated_data(self, validation_result: Dict[str, Any]) -> str | None:
         """
         Save successfully validated data to a JSON file
@@ -184,6 +242,9 @@ Return JSON in this exact format:
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         original_filename = Path(validation_result['filename']).stem
+        if validation_result.get('record_id'):
+            # Several records come from one source document
+            original_filename += f"_{validation_result['record_id']}"
         json_filename = f"{timestamp}_{original_filename}.json"
         json_filepath = Path(self.validated_data_path) / json_filename
         
@@ -194,7 +255,8 @@ Return JSON in this exact format:
             'extracted_data': validation_result['extracted_data'],
             'validation_status': 'complete',
             'all_fields_present': True,
-            'plan_id_from_pdf': validation_result.get('plan_id_from_pdf')
+            'plan_id_from_pdf': validation_result.get('plan_id_from_pdf'),
+            'record_id': validation_result.get('record_id')
         }
         
         # Save to JSON file
@@ -94,6 +94,56 @@ class RequestorInteractionAgent:
             result['error'] = str(e)
         
         return result
+
+    def handle_record_results(self, validation_results: List[Dict[str, Any]], sender_email: str,
+                              original_email_message=None) -> Dict[str, Any]:
+        """
+        Handle the per-record results of one attachment (spreadsheet rows or PDF plan sections)
+        All incomplete records are reported in a single email with one tracking record
+        
+        Args:
+            validation_results: Results sharing one filename, each with a record_id
+            sender_email: Email address to send response to
+            original_email_message: Original email message object
+            
+        Returns:
+            Dictionary with action taken
+        """
+        result = {
+            'action': None,
+            'email_sent': False,
+            'request_tracked': False,
+            'error': None
+        }
+        
+        incomplete = [v for v in validation_results if not v['all_fields_present']]
+        if not incomplete:
+            logger.info(f"✓ All {len(validation_results)} record(s) complete in: {validation_results[0]['filename']}")
+            result['action'] = 'validation_successful'
+            return result
+        
+        try:
+            logger.info(f"✗ {len(incomplete)} of {len(validation_results)} record(s) incomplete: "
+                        f"{', '.join(str(v.get('record_id')) for v in incomplete)}")
+            
+            email_body = self._generate_missing_records_email(incomplete, len(validation_results))
+            tracking_id = self._send_email_with_tracking(
+                sender_email,
+                email_body,
+                {'filename': incomplete[0]['filename'], 'records': incomplete},
+                request_type='missing_fields'
+            )
+            
+            result['action'] = 'missing_fields_notification_sent'
+            result['email_sent'] = True
+            result['request_tracked'] = True
+            result['tracking_id'] = tracking_id
+            
+        except Exception as e:
+            logger.error(f"Error handling record results: {str(e)}")
+            result['error'] = str(e)
+        
+        return result
     
     def _send_email_with_tracking(self, recipient: str, body: str, 
                                   validation_result: Dict[str, Any], 
@@ -111,8 +161,8 @@ class RequestorInteractionAgent:
             Tracking ID
         """
         try:
-            # Generate tracking ID
-            tracking_id = f"REQ_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            # Generate tracking ID (microseconds keep IDs created in the same second apart)
+            tracking_id = f"REQ_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
             
             # Add tracking ID to email
             tracked_body = f"[Reference: {tracking_id}]\n\n{body}"
@@ -171,6 +221,8 @@ class RequestorInteractionAgent:
         """Generate professional email for missing fields"""
         missing_fields = validation_result.get('missing_fields', [])
         filename = Path(validation_result['filename']).name
+        if validation_result.get('record_id'):
+            filename = f"{filename}, {validation_result['record_id']}"
         extracted_data = validation_result.get('extracted_data', {})
         
         # Get present fields (fields with non-empty values)
@@ -252,6 +304,42 @@ For urgent matters, please contact your JushQuant Associate directly.
         
         return email_body
     
+    def _generate_missing_records_email(self, incomplete: List[Dict[str, Any]], total_records: int) -> str:
+        """Generate one email listing every incomplete record of a multi-record document"""
+        filename = Path(incomplete[0]['filename']).name
+        
+        record_lines = []
+        for validation in incomplete:
+            missing = ', '.join(f.replace('_', ' ').title() for f in validation.get('missing_fields', []))
+            record_lines.append(f"   ❌ {validation.get('record_id')}: missing {missing}")
+        record_list = "\n".join(record_lines)
+        remaining = ("\n\nThe remaining records are complete and are being processed automatically."
+                     if len(incomplete) < total_records else "")
+        
+        return f"""Dear Requestor,
+
+Thank you for submitting your New Plan Setup document "{filename}".
+
+Upon automated review, {len(incomplete)} of the {total_records} plan record(s) it contains are missing mandatory information:
+
+{record_list}{remaining}
+
+NEXT STEPS:
+Please send a new email with a corrected document containing the records listed above with ALL required information.
+
+If you have any questions or need assistance, please contact us.
+
+Best regards,
+Suresh Babu G
+Plan Setup Team
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+This is an automated message from our Agentic AI Workflow System.
+
+For urgent matters, please contact your JushQuant Associate directly.
+"""
+    
     def _generate_unreadable_document_email(self, validation_result: Dict[str, Any]) -> str:
         """Generate email for unreadable documents"""
         filename = Path(validation_result['filename']).name
@@ -0,0 +1,148 @@
+"""
+TrOCR Backend Benchmark
+Compares OCR latency and accuracy of each TrOCR inference backend
+(pytorch fp32, dynamic int8, ONNX Runtime) over the sample attachments
+
+Usage:
+    python benchmark_ocr_backends.py [attachments_dir] [--backends pytorch,int8,onnx]
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from difflib import SequenceMatcher
+
+from utils.document_parser import DocumentParser
+from utils.ocr_models import TROCR_BACKENDS, TROCR_BASE
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+
+
+def load_expected_fields(validated_dir: Path) -> dict:
+    """Map attachment filename -> extracted_data from previously validated documents"""
+    expected = {}
+    for json_path in validated_dir.glob('*.json'):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            source = data.get('source_document', '').replace('\\', '/')
+            expected[Path(source).name] = data.get('extracted_data', {})
+        except Exception:
+            continue
+    return expected
+
+
+def ocr_document(parser: DocumentParser, filepath: Path) -> str:
+    """Force the OCR path, even for PDFs that also carry a digital text layer"""
+    if filepath.suffix.lower() == '.pdf':
+        return parser._parse_pdf_with_multipass_ocr(str(filepath)).strip()
+    return parser._parse_image_advanced(str(filepath)).strip()
+
+
+def field_recall(text: str, fields: dict) -> float | None:
+    """Fraction of known field values found in the OCR text (case/space-insensitive)"""
+    values = [str(v) for v in fields.values() if v]
+    if not values:
+        return None
+    normalized = ''.join(text.lower().split())
+    found = sum(1 for v in values if ''.join(v.lower().split()) in normalized)
+    return found / len(values)
+
+
+def run_benchmark(attachments_dir: Path, backends: list):
+    documents = sorted(
+        p for p in attachments_dir.iterdir()
+        if p.suffix.lower() == '.pdf' or p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+    if not documents:
+        print(f"❌ No PDF/image attachments found in {attachments_dir}")
+        return False
+
+    expected = load_expected_fields(Path('data/validated_documents'))
+
+    print("=" * 80)
+    print("TrOCR BACKEND BENCHMARK")
+    print("=" * 80)
+    print(f"Documents: {len(documents)} from {attachments_dir}")
+    print(f"Backends:  {', '.join(backends)}")
+
+    results = {}
+    for backend in backends:
+        print(f"\n▶ Backend: {backend}")
+        load_start = time.perf_counter()
+        parser = DocumentParser(ocr_config={
+            'trocr_backend': backend,
+            'cache_enabled': False,
+            'debug_images': 'off'
+        })
+        parser._ensure_models_loaded()  # engines load lazily - time them here, not in the first document
+        load_seconds = time.perf_counter() - load_start
+
+        texts, timings, recalls = {}, [], []
+        for doc in documents:
+            start = time.perf_counter()
+            text = ocr_document(parser, doc)
+            elapsed = time.perf_counter() - start
+            timings.append(elapsed)
+            texts[doc.name] = text
+
+            recall = field_recall(text, expected.get(doc.name, {}))
+            if recall is not None:
+                recalls.append(recall)
+            recall_str = f"{recall:.0%}" if recall is not None else "n/a"
+            print(f"   {doc.name}: {elapsed:.2f}s, {len(text)} chars, field recall {recall_str}")
+
+        # A backend that could not load silently serves pytorch - label its row accordingly
+        actual_backend = parser.models.resolved_backend(TROCR_BASE, backend)
+        if actual_backend != backend:
+            print(f"   ⚠️  {backend} unavailable - fell back to {actual_backend}")
+
+        results[backend] = {
+            'load_seconds': load_seconds,
+            'total_seconds': sum(timings),
+            'mean_seconds': sum(timings) / len(timings),
+            'field_recall': sum(recalls) / len(recalls) if recalls else None,
+            'fallback': actual_backend if actual_backend != backend else None,
+            'texts': texts
+        }
+
+    # Agreement with the fp32 reference (or the first backend run)
+    reference = 'pytorch' if 'pytorch' in results else backends[0]
+    for backend, result in results.items():
+        ratios = [
+            SequenceMatcher(None, results[reference]['texts'][name], text).ratio()
+            for name, text in result['texts'].items()
+        ]
+        result['agreement'] = sum(ratios) / len(ratios)
+
+    print("\n" + "=" * 80)
+    print("SUMMARY")
+    print("=" * 80)
+    print(f"{'Backend':<10} {'Load (s)':>10} {'Mean/doc (s)':>14} {'Speedup':>9} "
+          f"{'Field recall':>13} {f'vs {reference}':>12}")
+    base_mean = results[reference]['mean_seconds']
+    for backend, result in results.items():
+        recall = f"{result['field_recall']:.0%}" if result['field_recall'] is not None else "n/a"
+        speedup = base_mean / result['mean_seconds'] if result['mean_seconds'] else 0.0
+        fallback = f"  (fell back to {result['fallback']})" if result['fallback'] else ""
+        print(f"{backend:<10} {result['load_seconds']:>10.1f} {result['mean_seconds']:>14.2f} "
+              f"{speedup:>8.2f}x {recall:>13} {result['agreement']:>12.1%}{fallback}")
+    print("=" * 80)
+    return True
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare TrOCR inference backends")
+    arg_parser.add_argument('attachments_dir', nargs='?', default='data/inbox_attachments')
+    arg_parser.add_argument('--backends', default=','.join(TROCR_BACKENDS),
+                            help="Comma-separated backends to compare")
+    args = arg_parser.parse_args()
+
+    selected = [b.strip() for b in args.backends.split(',') if b.strip()]
+    success = run_benchmark(Path(args.attachments_dir), selected)
+    sys.exit(0 if success else 1)
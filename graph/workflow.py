@@ -3,6 +3,9 @@ from langgraph.graph import StateGraph, END
 from typing import TypedDict, Any, List
 import logging
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from utils.attachment import AttachmentPersister
+from utils.document_parser import INFRASTRUCTURE_ERRORS
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +13,9 @@ class EmailWorkflowState(TypedDict):
     """Enhanced state for the complete email processing workflow"""
     emails_found: List[dict]
     attachments_downloaded: List[str]
+    attachment_payloads: dict  # path -> in-memory Attachment (not set for 'disk' persistence)
     validation_results: List[dict]
+    deferred_attachments: List[str]  # Not processed due to an OCR infrastructure failure; retried next run
     interaction_results: List[dict]
     pending_requests_created: List[str]
     blueprism_submissions: List[dict]
@@ -28,18 +33,32 @@ class EmailProcessingWorkflow:
     Complete LangGraph workflow matching the Agentic AI Workflow diagram
     Includes: Agent 1 (Monitor), Agent 2 (Validate), Agent 3 (Interact), Agent 4 (Export)
     UPDATED: Now checks for duplicate Plan IDs before processing
+    Attachment persistence:
+        disk  - attachments are written to the download folder before parsing
+        valid - parsed from memory; documents with a valid record are saved in the background
+        all   - parsed from memory; every attachment is saved in the background
+        off   - parsed from memory and never written to disk
     """
 
+    ATTACHMENT_PERSIST_MODES = ('disk', 'valid', 'all', 'off')
+
     def __init__(self, email_monitor_agent, document_validator_agent, 
                  requestor_interaction_agent, data_export_agent, 
-                 document_parser, bp_exception_handler=None):
+                 document_parser, bp_exception_handler=None, max_section_workers: int = 4,
+                 attachment_persist: str = 'valid'):
 
         self.email_agent = email_monitor_agent
         self.validator_agent = document_validator_agent
         self.interaction_agent = requestor_interaction_agent
         self.export_agent = data_export_agent
-        self.parser = document_parser
+        self.parser = document_parser  # Shares engines via the process-wide OCR model registry
         self.exception_handler = bp_exception_handler  # NEW: Optional exception handler
+        self.max_section_workers = max(1, max_section_workers)  # Concurrent LLM calls for multi-plan PDFs
+        if attachment_persist not in self.ATTACHMENT_PERSIST_MODES:
+            logger.warning(f"Unknown attachment persistence '{attachment_persist}', using 'valid'")
+            attachment_persist = 'valid'
+        self.attachment_persist = attachment_persist
+        self.persister = AttachmentPersister()
         self.graph = self._build_graph()
         
         # NEW: Path to retry registry
@@ -94,6 +113,7 @@ class EmailProcessingWorkflow:
 
             state['emails_found'] = []
             state['attachments_downloaded'] = []
+            state['attachment_payloads'] = {}
             state['duplicates_handled'] = []  # NEW: Initialize duplicates list
 
             if not emails:
@@ -108,10 +128,22 @@ class EmailProcessingWorkflow:
 
                 if self.email_agent.outlook.has_attachments(email_msg):
 
-                    downloaded = self.email_agent.outlook.download_attachments(
-                        email_msg,
-                        self.email_agent.download_path
-                    )
+                    if self.attachment_persist == 'disk':
+                        downloaded = self.email_agent.outlook.download_attachments(
+                            email_msg,
+                            self.email_agent.download_path
+                        )
+                    else:
+                        # Parsed straight from the payload bytes; saving is a background side effect
+                        attachments = self.email_agent.outlook.read_attachments(
+                            email_msg,
+                            self.email_agent.download_path
+                        )
+                        downloaded = [attachment.path for attachment in attachments]
+                        for attachment in attachments:
+                            state['attachment_payloads'][attachment.path] = attachment
+                            if self.attachment_persist == 'all':
+                                self.persister.persist(attachment)
 
                     state['emails_found'].append({
                         'email_message': email_msg,
@@ -150,6 +182,7 @@ class EmailProcessingWorkflow:
             return state
 
         state['validation_results'] = []
+        state['deferred_attachments'] = []
 
         try:
             # NEW: Load retry registry once at the start
@@ -158,75 +191,72 @@ class EmailProcessingWorkflow:
             for attachment_path in state['attachments_downloaded']:
                 logger.info(f"Processing: {attachment_path}")
 
-                document_text = self.parser.parse_document(attachment_path)
-
-                if not document_text:
-                    logger.warning(f"⚠️  Could not extract text from: {attachment_path}")
-                    state['validation_results'].append({
-                        'all_fields_present': False,
-                        'extracted_data': {},
-                        'missing_fields': self.validator_agent.mandatory_fields,
-                        'filename': attachment_path,
-                        'error_type': 'cannot_read_document',
-                        'error_message': 'Unable to extract text'
-                    })
+                # Get requester email from state
+                requester_email = None
+                for email_data in state.get('emails_found', []):
+                    if attachment_path in email_data.get('attachments', []):
+                        requester_email = email_data['sender']
+                        break
+
+                # In-memory Attachment when one was read, otherwise the downloaded file
+                source = state.get('attachment_payloads', {}).get(attachment_path, attachment_path)
+
+                try:
+                    # Bulk intake: a spreadsheet with one plan per row is mapped by its headers, no LLM
+                    validation_results = self._validate_spreadsheet_rows(attachment_path, source)
+                    if validation_results is None:
+                        validation_results = self._validate_document(attachment_path, requester_email, source)
+                except INFRASTRUCTURE_ERRORS as e:
+                    # Not the document's fault - leave its email unread so the next run retries it
+                    logger.error(f"⚠️  Processing error for {attachment_path}: {str(e)} - will retry")
+                    state['deferred_attachments'].append(attachment_path)
                     continue
 
-                logger.info(f"✅ Extracted {len(document_text)} characters of text")
-
-                validation_result = self.validator_agent.validate_and_extract(
-                    document_text,
-                    attachment_path
-                )
-
-                # NEW: Check for duplicate Plan ID AFTER validation
-                if validation_result['all_fields_present']:
-                    plan_id = validation_result['extracted_data'].get('plan_id', '')
-                    
-                    # Get requester email from state
-                    requester_email = None
-                    for email_data in state.get('emails_found', []):
-                        if attachment_path in email_data.get('attachments', []):
-                            requester_email = email_data['sender']
-                            break
+                for validation_result in validation_results:
+                    # NEW: Check for duplicate Plan ID AFTER validation
+                    if validation_result['all_fields_present']:
+                        plan_id = validation_result['extracted_data'].get('plan_id', '')
                     
-                    # Check if Plan ID already escalated
-                    if plan_id and plan_id in retry_registry:
-                        entry = retry_registry[plan_id]
-                        if entry.get('status') == 'ESCALATED':
-                            logger.warning(f"🚫 DUPLICATE SUBMISSION: Plan ID {plan_id} already escalated")
+                        # Check if Plan ID already escalated
+                        if plan_id and plan_id in retry_registry:
+                            entry = retry_registry[plan_id]
+                            if entry.get('status') == 'ESCALATED':
+                                logger.warning(f"🚫 DUPLICATE SUBMISSION: Plan ID {plan_id} already escalated")
                             
-                            # Mark as duplicate in validation result
-                            validation_result['is_duplicate'] = True
-                            validation_result['duplicate_info'] = entry
+                                # Mark as duplicate in validation result
+                                validation_result['is_duplicate'] = True
+                                validation_result['duplicate_info'] = entry
                             
-                            # Track duplicate
-                            state['duplicates_handled'].append({
-                                'plan_id': plan_id,
-                                'filename': attachment_path,
-                                'requester_email': requester_email,
-                                'registry_entry': entry
-                            })
+                                # Track duplicate
+                                state['duplicates_handled'].append({
+                                    'plan_id': plan_id,
+                                    'filename': attachment_path,
+                                    'requester_email': requester_email,
+                                    'registry_entry': entry
+                                })
                             
-                            # Send duplicate notification email
-                            if self.exception_handler:
-                                self.exception_handler.send_duplicate_submission_email(plan_id, entry)
+                                # Send duplicate notification email
+                                if self.exception_handler:
+                                    self.exception_handler.send_duplicate_submission_email(plan_id, entry)
                             
-                            logger.info(f"📧 Sent duplicate submission notification")
+                                logger.info(f"📧 Sent duplicate submission notification")
+                            else:
+                                validation_result['is_duplicate'] = False
                         else:
                             validation_result['is_duplicate'] = False
-                    else:
-                        validation_result['is_duplicate'] = False
 
-                state['validation_results'].append(validation_result)
+                    state['validation_results'].append(validation_result)
 
-                if validation_result['all_fields_present'] and not validation_result.get('is_duplicate'):
-                    logger.info(f"✅ Validation PASSED: {attachment_path}")
-                elif validation_result.get('is_duplicate'):
-                    logger.info(f"🚫 Validation SKIPPED (duplicate): {attachment_path}")
-                else:
-                    logger.warning(f"❌ Validation FAILED: {attachment_path}")
-                    logger.warning(f"   Missing fields: {', '.join(validation_result['missing_fields'])}")
+                    label = attachment_path
+                    if validation_result.get('record_id'):
+                        label += f" [{validation_result['record_id']}]"
+                    if validation_result['all_fields_present'] and not validation_result.get('is_duplicate'):
+                        logger.info(f"✅ Validation PASSED: {label}")
+                    elif validation_result.get('is_duplicate'):
+                        logger.info(f"🚫 Validation SKIPPED (duplicate): {label}")
+                    else:
+                        logger.warning(f"❌ Validation FAILED: {label}")
+                        logger.warning(f"   Missing fields: {', '.join(validation_result['missing_fields'])}")
 
         except Exception as e:
             logger.error(f"❌ Error in Agent 2 (Document Validation): {str(e)}")
@@ -234,6 +264,91 @@ class EmailProcessingWorkflow:
 
         return state
 
+    def _validate_spreadsheet_rows(self, attachment_path: str, source) -> List[dict] | None:
+        """One validation result per data row of a structured spreadsheet, or None for other documents"""
+        mandatory_fields = self.validator_agent.mandatory_fields
+        fields = mandatory_fields + [f for f in ['plan_id'] if f not in mandatory_fields]
+        records = self.parser.extract_spreadsheet_records(source, fields)
+        if not records:
+            return None
+        logger.info(f"📊 Validating {len(records)} spreadsheet row(s) from {attachment_path}")
+        return [
+            self.validator_agent.validate_spreadsheet_record(data, attachment_path, record_id)
+            for record_id, data in records
+        ]
+
+    def _validate_document(self, attachment_path: str, requester_email: str | None, source) -> List[dict]:
+        """Validate a document: layout-template fast path, else full parse + LLM (one result per plan form)"""
+        # Fast path: sender's known single-page form layout -> OCR only the field regions, no LLM call
+        validation_result = None
+        template_match = self.parser.extract_with_template(source, requester_email)
+        if template_match:
+            validation_result = self.validator_agent.validate_template_fields(
+                template_match['fields'],
+                attachment_path
+            )
+            if not validation_result['all_fields_present']:
+                logger.info("Layout template left fields empty - falling back to full pipeline")
+                validation_result = None
+
+        if validation_result is None:
+            return self._parse_and_validate(attachment_path, requester_email, source)
+
+        return [validation_result]
+
+    def _parse_and_validate(self, attachment_path: str, requester_email: str | None, source) -> List[dict]:
+        """Full pipeline: parse document text, validate with the LLM, learn the sender's layout on success"""
+        document_text = self.parser.parse(source)
+        pages_read = self.parser.last_pages_read
+        if pages_read:
+            logger.info(f"📄 Read pages {pages_read['pages_read']} of {pages_read['page_count']}")
+
+        if not document_text:
+            logger.warning(f"⚠️  Could not extract text from: {attachment_path}")
+            return [{
+                'all_fields_present': False,
+                'extracted_data': {},
+                'missing_fields': self.validator_agent.mandatory_fields,
+                'filename': attachment_path,
+                'error_type': 'cannot_read_document',
+                'error_message': 'Unable to extract text'
+            }]
+
+        logger.info(f"✅ Extracted {len(document_text)} characters of text")
+
+        # Several plan forms batched into one PDF -> validate each section on its own
+        if Path(attachment_path).suffix.lower() == '.pdf':
+            sections = self.parser.split_plan_sections(document_text)
+            if len(sections) > 1:
+                return self._validate_sections(attachment_path, sections)
+
+        validation_result = self.validator_agent.validate_and_extract(
+            document_text,
+            attachment_path
+        )
+        if pages_read:
+            validation_result['pages_read'] = pages_read['pages_read']
+
+        if validation_result['all_fields_present'] and requester_email:
+            if self.parser.learn_template(requester_email, source, validation_result['extracted_data']):
+                logger.info(f"✅ Learned layout template for {requester_email}")
+
+        return [validation_result]
+
+    def _validate_sections(self, attachment_path: str, sections: List[dict]) -> List[dict]:
+        """Validate the plan sections of one PDF concurrently (LLM calls are I/O bound)"""
+        logger.info(f"📑 Found {len(sections)} plan forms in {attachment_path} - validating each section")
+
+        def validate(numbered):
+            number, section = numbered
+            result = self.validator_agent.validate_and_extract(section['text'], attachment_path)
+            result['record_id'] = f"section{number}"
+            result['pages'] = section['pages']
+            return result
+
+        with ThreadPoolExecutor(max_workers=min(self.max_section_workers, len(sections))) as pool:
+            return list(pool.map(validate, enumerate(sections, start=1)))
+
     # -------------------------------------------------------------------------
     # AGENT 3 – REQUESTOR INTERACTION
     # -------------------------------------------------------------------------
@@ -242,7 +357,7 @@ class EmailProcessingWorkflow:
         logger.info("AGENT 3: REQUESTOR INTERACTION - Handle Missing Info & Follow-ups")
         logger.info("="*80)
 
-        if not state.get('validation_results'):
+        if not state.get('validation_results') and not state.get('deferred_attachments'):
             logger.info("❌ No validation results to handle")
             return state
 
@@ -256,61 +371,95 @@ class EmailProcessingWorkflow:
                 sender_email = email_data['sender']
                 email_message = email_data['email_message']
 
-                for attachment_path in email_data.get('attachments', []):
-                    validation = next(
-                        (v for v in state['validation_results'] if v['filename'] == attachment_path),
-                        None
-                    )
-                    if not validation:
+                deferred = [a for a in email_data.get('attachments', [])
+                            if a in state.get('deferred_attachments', [])]
+                if deferred:
+                    # Whole email is retried next run: no replies, no deletions, left unread
+                    logger.warning(f"⏸️  Leaving email from {sender_email} unread - "
+                                   f"{len(deferred)} attachment(s) hit a processing error")
+                    attachments = email_data.get('attachments', [])
+                    # Its other attachments are not exported now either - they are redone with it
+                    state['validation_results'] = [v for v in state['validation_results']
+                                                   if v['filename'] not in attachments]
+                    # Fetching the email set \Seen; clear it so the next run's UNSEEN search retries it
+                    if not self.email_agent.outlook.mark_as_unread(email_message):
+                        # Not picked up again automatically - keep the documents for manual follow-up
+                        logger.warning(f"⚠️  Could not mark email from {sender_email} unread - "
+                                       f"keeping its attachments in {self.email_agent.download_path}")
+                        for attachment_path in attachments:
+                            payload = state.get('attachment_payloads', {}).get(attachment_path)
+                            if payload is not None and self.attachment_persist != 'all':
+                                self.persister.persist(payload)
                         continue
+                    for attachment_path in attachments:
+                        if attachment_path in state.get('attachment_payloads', {}):
+                            self.persister.discard(attachment_path)
+                        elif os.path.exists(attachment_path):
+                            os.remove(attachment_path)  # Downloaded again on retry
+                    continue
 
-                    # NEW: Skip processing if duplicate
-                    if validation.get('is_duplicate'):
-                        logger.info(f"⏭️  Skipping duplicate: {attachment_path}")
-                        
-                        # Delete duplicate attachment
-                        try:
-                            if os.path.exists(attachment_path):
-                                os.remove(attachment_path)
-                                logger.info(f"🗑️  Deleted duplicate document: {attachment_path}")
-                        except Exception as del_err:
-                            logger.error(f"⚠️  Failed to delete duplicate: {str(del_err)}")
-                        
-                        # Mark email as read
-                        self.email_agent.outlook.mark_as_read(email_message)
+                for attachment_path in email_data.get('attachments', []):
+                    # Spreadsheets yield one validation per row; other documents exactly one
+                    validations = [v for v in state['validation_results'] if v['filename'] == attachment_path]
+                    if not validations:
                         continue
 
-                    interaction_result = self.interaction_agent.handle_validation_result(
-                        validation,
-                        sender_email,
-                        email_message
-                    )
-
-                    state['interaction_results'].append(interaction_result)
-
-                    if interaction_result.get('email_sent'):
-                        state['responses_sent'].append({'recipient': sender_email})
-
-                    if interaction_result.get('request_tracked'):
-                        tracking_id = interaction_result.get('tracking_id')
-                        if tracking_id:
-                            state['pending_requests_created'].append(tracking_id)
-
-                    if validation['all_fields_present']:
-                        json_path = self.validator_agent.save_validated_data(validation)
-                        if json_path:
-                            state['jsons_saved'].append(json_path)
-                            logger.info(f"✅ Saved validated data: {json_path}")
-
+                    # NEW: Skip processing if duplicate
+                    if any(v.get('is_duplicate') for v in validations):
+                        logger.info(f"⏭️  Skipping duplicate record(s): {attachment_path}")
+                    current = [v for v in validations if not v.get('is_duplicate')]
+
+                    if current:
+                        # Row/section records are answered with one email per attachment
+                        if any(v.get('record_id') for v in current):
+                            interaction_result = self.interaction_agent.handle_record_results(
+                                current,
+                                sender_email,
+                                email_message
+                            )
+                        else:
+                            interaction_result = self.interaction_agent.handle_validation_result(
+                                current[0],
+                                sender_email,
+                                email_message
+                            )
+
+                        state['interaction_results'].append(interaction_result)
+
+                        if interaction_result.get('email_sent'):
+                            state['responses_sent'].append({'recipient': sender_email})
+
+                        if interaction_result.get('request_tracked'):
+                            tracking_id = interaction_result.get('tracking_id')
+                            if tracking_id:
+                                state['pending_requests_created'].append(tracking_id)
+
+                    for validation in current:
+                        if validation['all_fields_present']:
+                            json_path = self.validator_agent.save_validated_data(validation)
+                            if json_path:
+                                state['jsons_saved'].append(json_path)
+                                logger.info(f"✅ Saved validated data: {json_path}")
+
+                    # Keep the document only while some record from it is still being processed
+                    payload = state.get('attachment_payloads', {}).get(attachment_path)
+                    if any(v['all_fields_present'] and not v.get('is_duplicate') for v in validations):
+                        if payload is not None and self.attachment_persist == 'valid':
+                            self.persister.persist(payload)
                     else:
+                        reason = "duplicate" if all(v.get('is_duplicate') for v in validations) else "invalid"
                         try:
-                            if os.path.exists(attachment_path):
+                            if payload is not None:
+                                # Never written (or a background write is cancelled/undone)
+                                if self.persister.discard(attachment_path):
+                                    logger.info(f"🗑️  Deleted {reason} document: {attachment_path}")
+                            elif os.path.exists(attachment_path):
                                 os.remove(attachment_path)
-                                logger.info(f"🗑️  Deleted invalid document: {attachment_path}")
+                                logger.info(f"🗑️  Deleted {reason} document: {attachment_path}")
                             else:
                                 logger.warning(f"⚠️  File not found for deletion: {attachment_path}")
                         except Exception as del_err:
-                            logger.error(f"⚠️  Failed to delete invalid document: {str(del_err)}")
+                            logger.error(f"⚠️  Failed to delete {reason} document: {str(del_err)}")
 
                     self.email_agent.outlook.mark_as_read(email_message)
 
@@ -405,6 +554,8 @@ class EmailProcessingWorkflow:
 
         logger.info("\n📄 AGENT 2 - Document Validation:")
         logger.info(f"   • Documents validated: {len(state.get('validation_results', []))}")
+        if state.get('deferred_attachments'):
+            logger.info(f"   • Deferred (processing error, retried next run): {len(state['deferred_attachments'])}")
         valid_count = sum(1 for v in state.get('validation_results', []) if v.get('all_fields_present'))
         invalid_count = len(state.get('validation_results', [])) - valid_count
         duplicate_count = len(state.get('duplicates_handled', []))
@@ -444,7 +595,9 @@ class EmailProcessingWorkflow:
         initial_state = {
             'emails_found': [],
             'attachments_downloaded': [],
+            'attachment_payloads': {},
             'validation_results': [],
+            'deferred_attachments': [],
             'interaction_results': [],
             'pending_requests_created': [],
             'blueprism_submissions': [],
@@ -459,6 +612,7 @@ class EmailProcessingWorkflow:
         }
 
         final_state = self.graph.invoke(initial_state)
+        self.persister.flush()
 
         logger.info("\n" + "="*80)
         logger.info("WORKFLOW EXECUTION COMPLETED")
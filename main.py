@@ -25,6 +25,7 @@ from pathlib import Path
 
 from utils.outlook_connector import OutlookConnector
 from utils.document_parser import DocumentParser
+from utils.ocr_settings import load_ocr_settings, build_ocr_config
 from utils.data_exporter import DataExporter
 from agents.email_monitor_agent import EmailMonitorAgent
 from agents.document_validator_agent import DocumentValidatorAgent
@@ -84,6 +85,10 @@ def load_configuration():
         'groq_model': os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile'),
         'mandatory_fields': os.getenv('MANDATORY_FIELDS', 'name,address,phone_number').split(','),
         
+        **load_ocr_settings(),
+        'max_section_workers': int(os.getenv('MAX_SECTION_WORKERS', 4)),
+        'attachment_persist': os.getenv('ATTACHMENT_PERSIST', 'valid').lower(),
+        
         'check_interval': int(os.getenv('CHECK_INTERVAL', 300)),
         'log_exports': os.getenv('LOG_EXPORTS', 'true').lower() == 'true'
     }
@@ -217,7 +222,11 @@ def main():
         )
         
         logger.info("Initializing Document Parser...")
-        document_parser = DocumentParser()
+        ocr_config = build_ocr_config(config)
+        document_parser = DocumentParser.shared(ocr_config)
+        if config['ocr_warmup']:
+            # Email polling starts right away; OCR work waits until the engines are warm
+            document_parser.start_warmup()
         
         monitor_config = {
             'sender': config['monitor_sender'],
@@ -275,7 +284,9 @@ def main():
             requestor_interaction_agent=requestor_interaction,
             data_export_agent=data_export,
             document_parser=document_parser,
-            bp_exception_handler=exception_handler  # NEW: Pass exception handler
+            bp_exception_handler=exception_handler,  # NEW: Pass exception handler
+            max_section_workers=config['max_section_workers'],
+            attachment_persist=config['attachment_persist']
         )
         
         # ---------------------------------------------------------
@@ -305,6 +316,8 @@ def main():
         logger.info("  " + format_status(True, "Agent 5: BP Exception Handler"))
         logger.info(f"     Queue Database: {queue_db_path}")
         logger.info(f"     Retry Registry: {retry_registry_path}")
+        logger.info("  " + format_status(document_parser.is_ready,
+                                         "OCR engines" + ("" if document_parser.is_ready else " (warming up in background)")))
 
         logger.info("="*80)
 
@@ -2,10 +2,12 @@
 Quick Start Script - Launches all components
 """
 
+import os
 import subprocess
 import sys
 import time
 from pathlib import Path
+from dotenv import load_dotenv
 
 def start_all():
     """Start all system components in separate processes"""
@@ -39,6 +41,13 @@ def start_all():
         processes.append(("BP Worker", worker))
         time.sleep(2)
         
+        # 1b. Start the shared OCR service (only when main is configured to use one)
+        load_dotenv()
+        if os.getenv('OCR_SERVICE_SOCKET'):
+            print("   Starting OCR Service...")
+            ocr_service = subprocess.Popen([sys.executable, "-m", "utils.ocr_service"])
+            processes.append(("OCR Service", ocr_service))
+        
         # 2. Start Main System (Agents 1-5)
         print("2. Starting Main System (Agents 1-5)...")
         main = subprocess.Popen([sys.executable, "main.py"])
@@ -0,0 +1,123 @@
+import io
+import os
+import queue
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class Attachment:
+    """
+    Email attachment held in memory and parsed straight from its payload bytes
+    path is where the attachment is (or would be) saved; it identifies the
+    attachment through the workflow whether or not it is ever written to disk.
+    """
+
+    def __init__(self, name: str, data, content_type: str = 'application/octet-stream', path: str = None):
+        """
+        Initialize attachment
+
+        Args:
+            name: Original attachment filename (its suffix selects the parser)
+            data: Decoded payload as bytes or memoryview
+            content_type: MIME type from the email part
+            path: Save location when persisted
+        """
+        self.name = name
+        self.data = data
+        self.content_type = content_type
+        self.path = path or name
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.name).suffix.lower()
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def open(self) -> io.BytesIO:
+        """Readable binary stream over the payload (no copy for bytes payloads)"""
+        return io.BytesIO(self.data)
+
+    def __str__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"Attachment({self.name!r}, {self.size} bytes, {self.content_type})"
+
+
+def source_name(source) -> str:
+    """Filename of a path or Attachment"""
+    return Path(source.name if isinstance(source, Attachment) else source).name
+
+
+def source_suffix(source) -> str:
+    """Lower-case extension of a path or Attachment"""
+    return Path(source_name(source)).suffix.lower()
+
+
+def open_source(source):
+    """Binary stream over a path or Attachment, usable as a context manager"""
+    if isinstance(source, Attachment):
+        return source.open()
+    return open(source, 'rb')
+
+
+def readable(source):
+    """What path-or-file APIs (PIL, PyPDF2, openpyxl, python-docx) should be given for a source"""
+    return source.open() if isinstance(source, Attachment) else source
+
+
+class AttachmentPersister:
+    """
+    Off-the-hot-path writer that saves in-memory attachments to their path
+    Writes happen on a background thread; discard() cancels a pending write or
+    removes a file that was already written.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._discarded = set()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def persist(self, attachment: Attachment):
+        """Queue an attachment for writing without blocking the caller"""
+        with self._lock:
+            self._discarded.discard(attachment.path)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._drain, name="attachment-writer", daemon=True)
+                self._worker.start()
+        self._queue.put(attachment)
+
+    def discard(self, path: str) -> bool:
+        """Cancel a pending write of path, or delete it if already written; True if a file was removed"""
+        with self._lock:
+            self._discarded.add(path)
+            if os.path.exists(path):
+                os.remove(path)
+                return True
+        return False
+
+    def flush(self):
+        """Block until every queued attachment has been written"""
+        self._queue.join()
+
+    def _drain(self):
+        while True:
+            attachment = self._queue.get()
+            try:
+                with self._lock:
+                    if attachment.path in self._discarded:
+                        continue
+                    Path(attachment.path).parent.mkdir(parents=True, exist_ok=True)
+                    with open(attachment.path, 'wb') as f:
+                        f.write(attachment.data)
+                logger.info(f"Saved attachment: {Path(attachment.path).name}")
+            except Exception as e:
+                logger.warning(f"Could not save attachment {attachment.path}: {str(e)}")
+            finally:
+                self._queue.task_done()
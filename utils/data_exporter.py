@@ -44,11 +44,18 @@ class DataExporter:
             # Extract the actual field data
             extracted_fields = validated_data.get('extracted_data', {})
             
+            # Records split from one source document (spreadsheet rows, PDF sections) get their own id
+            record_id = validated_data.get('record_id')
+            export_id = f"EXPORT_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            if record_id:
+                export_id += f"_{record_id}"
+            
             # Create clean JSON structure
             json_data = {
-                'export_id': f"EXPORT_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                'export_id': export_id,
                 'timestamp': datetime.now().isoformat(),
                 'source_document': validated_data.get('source_document', validated_data.get('filename', 'unknown')),
+                'record_id': record_id,
                 'validation_status': 'complete',
                 'plan_data': extracted_fields,  # The actual mandatory fields (name, address, phone, etc.)
                 'metadata': {
@@ -78,6 +85,8 @@ class DataExporter:
         try:
             export_id = data.get('export_id', f"EXPORT_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
             source_doc = Path(data.get('source_document', 'unknown')).stem
+            if data.get('record_id'):
+                source_doc += f"_{data['record_id']}"
             
             # Create filename: YYYYMMDD_HHMMSS_original_filename.json
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
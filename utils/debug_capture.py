@@ -0,0 +1,121 @@
+import os
+import queue
+import random
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from collections import deque
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class DebugImageWriter:
+    """
+    Off-the-hot-path writer for OCR debug images
+    Modes:
+        off     - nothing is captured
+        sampled - each image is captured with probability sample_rate
+        always  - every image is captured
+    Images are saved on a background thread and only the newest max_files are kept.
+    """
+
+    MODES = ('off', 'sampled', 'always')
+
+    def __init__(self, mode: str = 'off', debug_dir: str = './data/debug_images',
+                 sample_rate: float = 0.1, max_files: int = 50, max_pending: int = 8):
+        """
+        Initialize debug image writer
+
+        Args:
+            mode: 'off', 'sampled' or 'always'
+            debug_dir: Directory to write PNGs to
+            sample_rate: Capture probability in 'sampled' mode
+            max_files: Size of the on-disk ring; older captures are deleted
+            max_pending: Captures queued for writing before new ones are dropped
+        """
+        if mode not in self.MODES:
+            logger.warning(f"Unknown debug image mode '{mode}', using 'off'")
+            mode = 'off'
+
+        self.mode = mode
+        self.debug_dir = Path(debug_dir)
+        self.sample_rate = sample_rate
+        self.max_files = max(1, max_files)
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._ring = deque()
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+        if self.mode != 'off':
+            self.debug_dir.mkdir(parents=True, exist_ok=True)
+            existing = sorted(self.debug_dir.glob('*.png'), key=lambda p: p.stat().st_mtime)
+            self._ring.extend(existing)
+            logger.info(f"Debug image capture: {self.mode} (ring of {self.max_files} at {debug_dir})")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def capture(self, image, name: str):
+        """
+        Queue an image for writing without blocking the caller
+
+        Args:
+            image: PIL image or numpy array
+            name: Descriptive file stem, e.g. 'page_1_pass1_light'
+        """
+        if self.mode == 'off':
+            return
+        if self.mode == 'sampled' and random.random() >= self.sample_rate:
+            return
+
+        self._ensure_worker()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        try:
+            self._queue.put_nowait((image, f"{timestamp}_{name}.png"))
+        except queue.Full:
+            self.dropped += 1
+            logger.debug(f"Debug image queue full - dropped {name}")
+
+    def _ensure_worker(self):
+        """Start the writer thread (again, after a fork) if it is not running in this process"""
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._worker_pid != os.getpid():
+                # Queue state inherited across fork is not shared with the parent's thread
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._write_loop, name="debug-image-writer", daemon=True)
+            self._worker.start()
+
+    def _write_loop(self):
+        while True:
+            image, filename = self._queue.get()
+            try:
+                if not isinstance(image, Image.Image):
+                    image = Image.fromarray(image)
+                filepath = self.debug_dir / filename
+                image.save(filepath)
+                self._ring.append(filepath)
+
+                while len(self._ring) > self.max_files:
+                    oldest = self._ring.popleft()
+                    try:
+                        oldest.unlink()
+                    except FileNotFoundError:
+                        pass
+            except Exception as e:
+                logger.warning(f"Failed to write debug image {filename}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until queued captures are written (for tests and shutdown)"""
+        if self._worker is not None and self._worker_pid == os.getpid():
+            self._queue.join()
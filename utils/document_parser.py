@@ -1,61 +1,583 @@
+import io
 import os
+import re
+import time
 import logging
-from pathlib import Path
-import PyPDF2
+from typing import Dict, Any
 from docx import Document
 from openpyxl import load_workbook
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image, ImageDraw
 import torch
-from transformers import TrOCRProcessor, VisionEncoderDecoderModel
 import cv2
 import numpy as np
-import easyocr
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from collections import Counter
+from .ocr_models import get_model_registry, TROCR_BASE, TROCR_LARGE
+from .ocr_cache import OCRResultCache
+from .debug_capture import DebugImageWriter
+from .image_enhancement import PageEnhancer, enhance_array, to_grayscale_array
+from .layout_templates import LayoutTemplateStore, label_similarity, strip_label
+from .ocr_service import OCRServiceClient, OCRServiceUnavailable
+from .resource_governor import ResourceGovernor, DocumentMemoryExceeded
+from .pdf_backend import PDFRasterizer
+from .pdf_text import get_text_backend, missing_labels
+from .spreadsheet_records import iter_spreadsheet_records
+from .attachment import Attachment, source_name, source_suffix, open_source, readable
 
 logger = logging.getLogger(__name__)
 
+# Bump when parsing/OCR logic changes so cached results are not reused
+PARSER_VERSION = "6"
+
+# Ends every PDF page (blank ones included) in parsed text so multi-plan documents can be split
+# on page boundaries with their real page numbers
+PAGE_BREAK = "\n\f"
+
+# Infrastructure failures: raised to the caller instead of being reported as an unreadable document
+INFRASTRUCTURE_ERRORS = (OCRServiceUnavailable, DocumentMemoryExceeded)
+
+# Parser and document (path or in-memory Attachment) inherited copy-on-write by forked page workers
+_page_worker_parser = None
+_page_worker_source = None
+
+
+def _init_page_worker(torch_threads: int):
+    """Limit torch and OpenCV threads in each forked page worker"""
+    ResourceGovernor.apply_in_worker(torch_threads)
+
+
+def _ocr_page_in_worker(page):
+    """Rasterize and OCR one (page_num, page_count) of the inherited document in a forked worker"""
+    page_num, page_count = page
+    failures = _page_worker_parser.failure_count
+    text = _page_worker_parser._ocr_pdf_page(_page_worker_source, page_num, page_count)
+    # The worker's failure count dies with it - report whether this page was degraded
+    return text, _page_worker_parser.failure_count != failures
+
+
 class DocumentParser:
     """Advanced Parser with Multi-Pass OCR and Image Enhancement"""
+
+    _shared_parser = None
+    _shared_lock = threading.Lock()
     
-    def __init__(self):
-        """Initialize parser and load models"""
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Initializing DocumentParser on {self.device}...")
+    def __init__(self, model_registry=None, ocr_config: Dict[str, Any] = None):
+        """
+        Initialize parser with engines from the shared model registry
+        
+        Args:
+            model_registry: OCRModelRegistry to take engines from (defaults to the process-wide one)
+            ocr_config: Optional OCR tuning dict with keys:
+                - trocr_backend: 'pytorch', 'int8' or 'onnx' TrOCR inference backend (default 'pytorch')
+                - trocr_batch_size: Line crops per TrOCR generate call (default 16)
+                - easyocr_batch_size: Line crops per EasyOCR recognizer batch (default 16)
+                - engine_mode: 'ensemble' (all engines vote) or 'cascade' (confidence-gated)
+                - cascade_threshold: Confidence at which a line is accepted in cascade mode (default 0.8)
+                - detection_mode: 'per_pass' (recognize every box on every pass) or 'merged'
+                                  (boxes matching a line from an earlier pass reuse its text)
+                - box_match_iou: Overlap needed to treat two boxes as the same line (default 0.85)
+                - page_workers: Forked worker processes for multi-page OCR (default 1 = serial)
+                - worker_torch_threads: Torch intra-op threads per page worker (default 1)
+                - initial_dpi: DPI for the first rasterization of each PDF page (default 200)
+                - max_dpi: DPI for re-rendering low-confidence pages (default 400)
+                - rerender_confidence: Page confidence below which it is re-rendered at max_dpi (default 0.6)
+                - cache_enabled: Reuse parsed text for previously seen attachment bytes (default True)
+                - cache_path: Directory for the OCR result cache (default ./data/ocr_cache)
+                - cache_max_mb: Size budget for the OCR result cache (default 256)
+                - debug_images: 'off', 'sampled' or 'always' (default 'off')
+                - debug_sample_rate: Capture probability in 'sampled' mode (default 0.1)
+                - debug_max_files: Debug images kept on disk before the oldest are deleted (default 50)
+                - min_page_text_chars: Digital text below which a PDF page is OCR'd (default 10)
+                - early_exit_confidence: Pass confidence that skips the remaining passes (default 1.0)
+                - parallel_enhancement: Prepare pass images concurrently on a thread pool (default False)
+                - denoiser: Shared denoise filter: 'nlm', 'bilateral', 'median' or 'none' (default 'nlm')
+                - denoise_strength: Strength of the shared denoise (default 10)
+                - escalation_mode: 'page' (re-OCR whole page per pass) or 'region'
+                                   (re-OCR only low-confidence lines) (default 'page')
+                - region_confidence: Line confidence below which a region is escalated (default 0.6)
+                - box_grouping: 'word' (recognize EasyOCR boxes as-is) or 'line' (merge boxes on the
+                                same baseline and drop duplicates first) (default 'word')
+                - line_gap_ratio: Max horizontal gap, in line heights, between words of one line (default 1.0)
+                - layout_templates_enabled: Use/learn per-sender field-region templates (default False)
+                - layout_templates_path: JSON template store (default ./data/layout_templates.json)
+                - template_min_score: Label match score needed to trust a template (default 0.7)
+                - template_learn_attempts: Failed learn attempts per sender before learning stops (default 2)
+                - languages: EasyOCR language codes (default ['en'])
+                - use_large_model: Load TrOCR large for ensemble/cascade (default True)
+                - max_model_memory_mb: Engine memory budget; least-recently-used engines are
+                                       evicted beyond it (default unbounded)
+                - service_address: Unix socket of a running OCR service; page/crop OCR is sent there
+                                   instead of loading models in this process (default None)
+                - service_connect_timeout: Seconds to wait for the OCR service to come up (default 600)
+                - service_authkey: OCR service shared secret (default: the service's '<socket>.key' file)
+                - cpu_budget: Cores OCR may use in this process (default all)
+                - torch_threads: Torch intra-op threads (default cpu_budget)
+                - cv2_threads: OpenCV threads (default half of cpu_budget)
+                - max_rss_mb: Process RSS at which OCR of the current document is aborted (default off)
+                - pdf_backend: 'auto', 'pymupdf' (in-process) or 'pdf2image' (poppler) page rendering (default 'auto')
+                - pdf_embedded_images: OCR a scanned page's embedded image at native resolution
+                                       instead of rendering it (pymupdf only, default True)
+                - pdf_text_backend: 'pypdf2' or 'pymupdf' digital text extraction (default 'pypdf2')
+                - stop_labels: Field labels after which no further PDF pages are read once all have
+                               appeared in the digital text (default Name, Address, Phone, Plan ID;
+                               empty = read every page)
+                - section_label: Label that starts each form in a multi-plan PDF (default 'Plan ID')
+        """
+        ocr_config = ocr_config or {}
+        self.trocr_backend = ocr_config.get('trocr_backend', 'pytorch')
+        self.trocr_batch_size = int(ocr_config.get('trocr_batch_size', 16))
+        self.easyocr_batch_size = int(ocr_config.get('easyocr_batch_size', 16))
+        self.engine_mode = ocr_config.get('engine_mode', 'ensemble')
+        self.cascade_threshold = float(ocr_config.get('cascade_threshold', 0.8))
+        self.cascade_stats = Counter()
+        self.detection_mode = ocr_config.get('detection_mode', 'per_pass')
+        self.box_match_iou = float(ocr_config.get('box_match_iou', 0.85))
+        self.page_workers = int(ocr_config.get('page_workers', 1))
+        self.worker_torch_threads = int(ocr_config.get('worker_torch_threads', 1))
+        self.initial_dpi = int(ocr_config.get('initial_dpi', 200))
+        self.max_dpi = int(ocr_config.get('max_dpi', 400))
+        self.rerender_confidence = float(ocr_config.get('rerender_confidence', 0.6))
+        
+        self.min_page_text_chars = int(ocr_config.get('min_page_text_chars', 10))
+        self.early_exit_confidence = float(ocr_config.get('early_exit_confidence', 1.0))
+        self.parallel_enhancement = bool(ocr_config.get('parallel_enhancement', False))
+        self.denoiser = ocr_config.get('denoiser', 'nlm')
+        self.denoise_strength = int(ocr_config.get('denoise_strength', 10))
+        self.escalation_mode = ocr_config.get('escalation_mode', 'page')
+        self.region_confidence = float(ocr_config.get('region_confidence', 0.6))
+        self.box_grouping = ocr_config.get('box_grouping', 'word')
+        self.line_gap_ratio = float(ocr_config.get('line_gap_ratio', 1.0))
+        
+        # Page images for OCR: embedded scans or in-process rendering where possible
+        self.rasterizer = PDFRasterizer(
+            backend=ocr_config.get('pdf_backend', 'auto'),
+            extract_embedded=bool(ocr_config.get('pdf_embedded_images', True)),
+            max_dpi=self.max_dpi
+        )
+        
+        # Lazy digital text extraction with label-driven early stop
+        self.text_backend = get_text_backend(ocr_config.get('pdf_text_backend', 'pypdf2'))
+        self.stop_labels = list(ocr_config.get('stop_labels', ['Name', 'Address', 'Phone', 'Plan ID']))
+        self.section_label = ocr_config.get('section_label', 'Plan ID')
+        self._parse_info = threading.local()
+        
+        # OCR failures that degrade output (failed passes/pages, unloadable models); a parse
+        # during which this grows is not cached, so a transient failure is not served again
+        self._failures = 0
+        self._failures_lock = threading.Lock()
+        
+        # Content-addressed result cache
+        if ocr_config.get('cache_enabled', True):
+            self.cache = OCRResultCache(
+                cache_path=ocr_config.get('cache_path', './data/ocr_cache'),
+                max_size_mb=float(ocr_config.get('cache_max_mb', 256))
+            )
+        else:
+            self.cache = None
         
-        # Initialize EasyOCR reader
-        self.reader = easyocr.Reader(['en'], gpu=torch.cuda.is_available())
+        # Per-sender layout templates for the field-region fast path
+        if ocr_config.get('layout_templates_enabled', False):
+            self.templates = LayoutTemplateStore(ocr_config.get('layout_templates_path', './data/layout_templates.json'))
+        else:
+            self.templates = None
+        self.template_min_score = float(ocr_config.get('template_min_score', 0.7))
+        self.template_learn_attempts = int(ocr_config.get('template_learn_attempts', 2))
+        self._failed_learns = Counter()  # sender -> failed learn attempts (each costs a page of OCR)
+        self._learn_lock = threading.Lock()
         
-        # Load TrOCR models (base and large for ensemble)
+        # Debug images are written on a background thread, never on the OCR path
+        self.debug_writer = DebugImageWriter(
+            mode=ocr_config.get('debug_images', 'off'),
+            sample_rate=float(ocr_config.get('debug_sample_rate', 0.1)),
+            max_files=int(ocr_config.get('debug_max_files', 50))
+        )
+        
+        # Engines are resolved through the registry on first use, not at construction
+        self.languages = list(ocr_config.get('languages', ['en']))
+        self.use_large_model = bool(ocr_config.get('use_large_model', True))
+        self.models = model_registry or get_model_registry()
+        if ocr_config.get('max_model_memory_mb'):
+            self.models.set_memory_budget(float(ocr_config['max_model_memory_mb']))
+        self.device = self.models.device
+        logger.info(f"Initializing DocumentParser on {self.device} - OCR engines load on first use "
+                    f"(languages: {', '.join(self.languages)}, large model: {self.use_large_model})")
+        
+        # Thread budgets for torch/OpenCV and the per-document memory ceiling
+        self.governor = ResourceGovernor(
+            cpu_budget=int(ocr_config.get('cpu_budget', 0)) or None,
+            torch_threads=int(ocr_config.get('torch_threads', 0)) or None,
+            cv2_threads=int(ocr_config.get('cv2_threads', 0)) or None,
+            max_rss_mb=float(ocr_config.get('max_rss_mb', 0)) or None
+        )
+        self.governor.apply()
+        
+        # Remote OCR service (utils/ocr_service.py) holding the models for every client process
+        service_address = ocr_config.get('service_address')
+        self.service = OCRServiceClient(
+            service_address,
+            connect_timeout=float(ocr_config.get('service_connect_timeout', 600)),
+            authkey=ocr_config.get('service_authkey')
+        ) if service_address else None
+        # Set inside the OCR service to merge TrOCR work across concurrent jobs
+        self.trocr_batcher = None
+        
+        # Background warm-up (see start_warmup); OCR waits for it only once it has been started
+        self._warmup_thread = None
+        self._ready = threading.Event()
+    
+    @property
+    def reader(self):
+        """EasyOCR reader for the configured languages"""
+        return self.models.get_reader(self.languages)
+    
+    def _trocr(self, model_name: str):
+        """(processor, model) for a TrOCR checkpoint, or (None, None) if it cannot be loaded"""
+        engine = self.models.get_trocr(model_name, self.trocr_backend)
+        if engine is None:
+            self._record_failure()
+            return None, None
+        return engine
+    
+    @property
+    def ocr_available(self) -> bool:
+        return self._trocr(TROCR_BASE)[1] is not None
+    
+    @property
+    def has_large_model(self) -> bool:
+        return self.use_large_model and self._trocr(TROCR_LARGE)[1] is not None
+    
+    def _ensure_models_loaded(self):
+        """Load every engine this parser may use (e.g. before forking workers that should share them)"""
+        self.reader
+        if not self.ocr_available:
+            logger.error("Failed to load TrOCR base model")
+        elif self.has_large_model:
+            logger.info("✓ Loaded both base and large TrOCR models")
+        else:
+            logger.info("✓ Loaded base TrOCR model only (large model not available or disabled)")
+    
+    def start_warmup(self):
+        """Load the OCR engines and run a dummy inference on a background thread; returns immediately"""
+        if self._warmup_thread is not None:
+            return
+        if self.service is not None:
+            logger.info(f"OCR engines are held by the OCR service at {self.service.address} - no local warm-up")
+            return
+        self._warmup_thread = threading.Thread(target=self._warmup, name="ocr-warmup", daemon=True)
+        self._warmup_thread.start()
+        logger.info("OCR warm-up started in the background")
+    
+    def _warmup(self):
+        start = time.perf_counter()
         try:
-            logger.info("Loading TrOCR models...")
-            
-            # Base model (fast)
-            self.processor_base = TrOCRProcessor.from_pretrained('microsoft/trocr-base-handwritten')
-            self.model_base = VisionEncoderDecoderModel.from_pretrained('microsoft/trocr-base-handwritten').to(self.device)
+            self._ensure_models_loaded()
             
-            # Try loading large model (better accuracy)
-            try:
-                self.processor_large = TrOCRProcessor.from_pretrained('microsoft/trocr-large-handwritten')
-                self.model_large = VisionEncoderDecoderModel.from_pretrained('microsoft/trocr-large-handwritten').to(self.device)
-                self.has_large_model = True
-                logger.info("✓ Loaded both base and large TrOCR models")
-            except:
-                self.has_large_model = False
-                logger.info("✓ Loaded base TrOCR model only (large model not available)")
+            # One tiny inference per engine pays the first-call costs (kernel selection,
+            # tokenizer init, generate setup) before a real document arrives
+            sample = Image.new("RGB", (200, 48), "white")
+            ImageDraw.Draw(sample).text((10, 18), "Plan ID 12345", fill="black")
+            self.reader.readtext(to_grayscale_array(sample), paragraph=False)
+            self._run_easyocr_recognize([sample])
+            if self.ocr_available:
+                self._run_trocr_batch([sample], *self._trocr(TROCR_BASE))
+            if self.has_large_model:
+                self._run_trocr_batch([sample], *self._trocr(TROCR_LARGE))
             
-            self.ocr_available = True
+            logger.info(f"✓ OCR engines warmed up in {time.perf_counter() - start:.1f}s")
         except Exception as e:
-            logger.error(f"Failed to load TrOCR: {str(e)}")
-            self.ocr_available = False
+            logger.error(f"OCR warm-up failed: {str(e)} - engines will load on first use")
+        finally:
+            self._ready.set()
+    
+    @property
+    def is_ready(self) -> bool:
+        """True once warm-up has finished (or if it was never started)"""
+        return self._warmup_thread is None or self._ready.is_set()
+    
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Block OCR callers until warm-up has finished; documents with a text layer never wait"""
+        if self.is_ready:
+            return True
+        logger.info("⏳ Waiting for OCR warm-up to finish...")
+        return self._ready.wait(timeout)
+    
+    @classmethod
+    def shared(cls, ocr_config: Dict[str, Any] = None):
+        """
+        Return the process-wide parser instance, creating it on first call
+        
+        Args:
+            ocr_config: OCR tuning dict, only applied when the shared parser is first created
+        """
+        with cls._shared_lock:
+            if cls._shared_parser is None:
+                cls._shared_parser = cls(ocr_config=ocr_config)
+            return cls._shared_parser
     
     @staticmethod
-    def parse_document(filepath: str) -> str:
-        """Extract text from a document"""
-        parser = DocumentParser()
-        return parser._parse_file_by_extension(filepath)
+    def parse_document(filepath) -> str:
+        """Extract text from a document using the shared parser"""
+        return DocumentParser.shared().parse(filepath)
 
-    def _parse_file_by_extension(self, filepath: str) -> str:
-        ext = Path(filepath).suffix.lower()
+    def parse(self, filepath) -> str:
+        """Extract text from a document (file path or in-memory Attachment) using this parser's loaded engines"""
+        self._parse_info.pages_read = None
+        return self._parse_file_by_extension(filepath)
+
+    def _record_failure(self):
+        with self._failures_lock:
+            self._failures += 1
+
+    @property
+    def failure_count(self) -> int:
+        """OCR failures so far in this process, plus degraded OCR service responses"""
+        service_failures = self.service.degraded_responses if self.service is not None else 0
+        return self._failures + service_failures
+
+    @property
+    def last_pages_read(self) -> Dict[str, Any] | None:
+        """{'pages_read', 'page_count'} of the last PDF parsed on this thread (None if not read from disk)"""
+        return getattr(self._parse_info, 'pages_read', None)
+
+    def _parse_file_by_extension(self, filepath) -> str:
+        """Return cached text for previously seen attachment bytes, otherwise parse and cache"""
+        if self.cache is None:
+            return self._parse_uncached(filepath)
+        
+        try:
+            cache_key = OCRResultCache.make_key(filepath, self.cache_version)
+        except Exception as e:
+            logger.warning(f"Could not hash {filepath} for OCR cache: {str(e)}")
+            return self._parse_uncached(filepath)
+        
+        cached_text = self.cache.get(cache_key)
+        if cached_text is not None:
+            logger.info(f"✓ OCR cache hit for {source_name(filepath)} ({len(cached_text)} characters)")
+            return cached_text
+        
+        failures = self.failure_count
+        text = self._parse_uncached(filepath)
+        if text and self.failure_count != failures:
+            # Possibly degraded by a transient failure (may be another document's, when parsing concurrently)
+            logger.warning(f"Not caching OCR result for {source_name(filepath)} - OCR failures during parse")
+        elif text:
+            self.cache.put(cache_key, text, source=source_name(filepath))
+        return text
+
+    @property
+    def cache_version(self) -> str:
+        """Parser/model/settings fingerprint mixed into cache keys"""
+        return "|".join([
+            PARSER_VERSION,
+            TROCR_BASE,
+            TROCR_LARGE if self.use_large_model else "no-large",
+            ",".join(self.languages),
+            self.trocr_backend,
+            self.engine_mode,
+            self.detection_mode,
+            f"{self.denoiser}{self.denoise_strength}",
+            self.rasterizer.backend + ("+embedded" if self.rasterizer.extract_embedded else ""),
+            self.escalation_mode,
+            self.box_grouping,
+            f"dpi{self.initial_dpi}-{self.max_dpi}@{self.rerender_confidence}",
+            f"exit{self.early_exit_confidence}",
+            f"minchars{self.min_page_text_chars}",
+            f"cascade{self.cascade_threshold}",
+            f"region{self.region_confidence}",
+            f"gap{self.line_gap_ratio}",
+            f"iou{self.box_match_iou}",
+            self.text_backend.name,
+            ",".join(self.stop_labels),
+            self.section_label
+        ])
+
+    # =========================================================================
+    # Layout-template fast path
+    # =========================================================================
+
+    def extract_with_template(self, filepath, template_id: str) -> Dict[str, Any] | None:
+        """
+        OCR only the known field regions of a document matching a stored layout template
+        
+        Returns:
+            {'fields', 'score', 'text'} or None when there is no usable template,
+            the document has a digital text layer or several pages (which may bundle
+            several plan forms), or the match score is below template_min_score
+        """
+        if self.templates is None or not template_id:
+            return None
+        template = self.templates.get(template_id)
+        if not template:
+            return None
+        
+        try:
+            self.wait_until_ready()
+            # Multi-page PDFs go through the full pipeline so every plan form is split out
+            page = self._load_first_page_for_ocr(filepath, single_page=True)
+            if page is None:
+                return None
+            
+            width, height = page.size
+            field_names = list(template['fields'])
+            crops = []
+            for field in field_names:
+                left, top, right, bottom = template['fields'][field]['rect']
+                crops.append(page.crop((
+                    max(0, int(left * width) - 10), max(0, int(top * height) - 10),
+                    min(width, int(right * width) + 10), min(height, int(bottom * height) + 10)
+                )))
+            
+            texts, _ = self._recognize_crops(crops)
+            
+            fields, scores, lines = {}, [], []
+            for field, text in zip(field_names, texts):
+                label = template['fields'][field].get('label', '')
+                if label:
+                    scores.append(label_similarity(text, label))
+                fields[field] = strip_label(text, label)
+                lines.append(text)
+            
+            # Only labeled regions can confirm the layout matches
+            score = sum(scores) / len(scores) if scores else 0.0
+            if score < self.template_min_score:
+                logger.info(f"Layout template '{template_id}' match score {score:.2f} too low - using full pipeline")
+                return None
+            
+            logger.info(f"✓ Layout template '{template_id}' matched (score {score:.2f}) - "
+                        f"OCR'd {len(crops)} field region(s) only")
+            return {'fields': fields, 'score': score, 'text': "\n".join(lines)}
+        except INFRASTRUCTURE_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(f"Layout template fast path failed for {filepath}: {str(e)}")
+            return None
+
+    def learn_template(self, template_id: str, filepath, extracted_data: Dict[str, str]) -> bool:
+        """Learn a sender's field regions from a successfully validated scanned document (page 1 only)"""
+        if self.templates is None or not template_id or self.templates.get(template_id):
+            return False
+        with self._learn_lock:
+            if self._failed_learns[template_id] >= self.template_learn_attempts:
+                return False
+        
+        try:
+            page = self._load_first_page_for_ocr(filepath)
+            if page is None:
+                return False
+            
+            learned = self.templates.learn(template_id, self._page_lines(page), page.size, extracted_data)
+        except INFRASTRUCTURE_ERRORS as e:
+            # Transient - the document is already validated, so skip learning without counting it
+            logger.warning(f"Skipped learning layout template from {filepath}: {str(e)}")
+            return False
+        except Exception as e:
+            logger.warning(f"Could not learn layout template from {filepath}: {str(e)}")
+            learned = False
+        
+        if not learned:
+            with self._learn_lock:
+                self._failed_learns[template_id] += 1
+                if self._failed_learns[template_id] >= self.template_learn_attempts:
+                    logger.info(f"Layout of '{template_id}' could not be learned in "
+                                f"{self.template_learn_attempts} attempt(s) - not retrying")
+        return learned
+
+    def _page_lines(self, page):
+        """Detected and recognized lines of a page ('light' pass) as [{'rect', 'text', 'confidence'}]"""
+        if self.service is not None:
+            return self.service.page_lines(page)
+        enhancer = PageEnhancer(page, denoiser=self.denoiser, denoise_strength=self.denoise_strength)
+        return self._detect_and_recognize(enhancer.variant('light'), page, original_grey=enhancer.grey)
+
+    def split_plan_sections(self, text: str, label: str = None) -> list:
+        """
+        Split parsed PDF text into one section per plan form
+        A page starts a new section when its label (default section_label) carries an ID
+        different from the current section's, or is left blank, so a form repeating
+        "Plan ID: X" as a page header stays one section. The label must be followed by
+        ':', '#' or '-' and an ID containing a digit (or nothing, for a blank form);
+        other mentions of the label are ignored.
+        
+        Returns:
+            [{'pages': [1-based pages of the parsed text], 'text': str}]
+        """
+        label = label or self.section_label
+        # Tolerate spacing and the usual OCR confusions (I/l/1, O/0) in the label
+        confusable = {'i': '[il1|]', 'l': '[il1|]', '1': '[il1|]', 'o': '[o0]', '0': '[o0]'}
+        pattern = re.compile(r'\s*'.join(confusable.get(c, re.escape(c)) for c in label.lower() if not c.isspace())
+                             + r'[ \t]*[:#\-][ \t_]*([A-Za-z0-9][A-Za-z0-9\-/]*)?', re.IGNORECASE)
+        
+        def page_value(page_text):
+            """Normalized ID of the page's first plan label, '' if left blank, None if there is none"""
+            for match in pattern.finditer(page_text):
+                token = match.group(1)
+                if token is None:
+                    if page_text[match.end():].split('\n', 1)[0].strip() == '':
+                        return ''
+                elif any(c.isdigit() for c in token):
+                    return token.upper().replace('O', '0')
+            return None
+        
+        sections = []
+        for page_num, page_text in enumerate(text.split(PAGE_BREAK), start=1):
+            value = page_value(page_text)
+            current = sections[-1]['value'] if sections else None
+            if not sections or (value is not None and current is not None and (value == '' or value != current)):
+                sections.append({'pages': [], 'texts': [], 'value': None})
+            sections[-1]['pages'].append(page_num)
+            sections[-1]['texts'].append(page_text)
+            if sections[-1]['value'] is None:
+                sections[-1]['value'] = value
+        
+        return [{'pages': sec['pages'], 'text': PAGE_BREAK.join(sec['texts']).strip()} for sec in sections]
+
+    @staticmethod
+    def extract_spreadsheet_records(filepath, fields) -> list | None:
+        """
+        Structured spreadsheet intake: one {field: value} record per data row, no LLM
+        
+        Returns:
+            [(record_id, fields)] or None if the file is not an .xlsx with a recognizable header row
+        """
+        if source_suffix(filepath) != '.xlsx':
+            return None
+        try:
+            records = list(iter_spreadsheet_records(filepath, fields))
+        except Exception as e:
+            logger.warning(f"Structured spreadsheet read failed for {filepath}: {str(e)}")
+            return None
+        if not records:
+            return None
+        logger.info(f"✓ Read {len(records)} row record(s) from {source_name(filepath)}")
+        return records
+
+    def _load_first_page_for_ocr(self, filepath, single_page: bool = False):
+        """
+        Page 1 of a scanned PDF or an image as RGB; None for digital-text PDFs and other formats
+        (and, with single_page, for PDFs of more than one page)
+        """
+        ext = source_suffix(filepath)
+        if ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
+            return self._load_image(filepath)
+        if ext != '.pdf':
+            return None
+        
+        pages = self.text_backend.iter_pages(filepath)
+        try:
+            _, page_count, first_page_text = next(pages)
+        finally:
+            pages.close()
+        if single_page and page_count > 1:
+            return None
+        if len(first_page_text.strip()) >= self.min_page_text_chars:
+            return None
+        page = self.rasterizer.embedded_scan(filepath, 1) or self._render_pdf_page(filepath, 1, self.initial_dpi)
+        return page.convert("RGB")
+
+    def _parse_uncached(self, filepath) -> str:
+        ext = source_suffix(filepath)
         try:
             if ext == '.pdf':
                 return self._parse_pdf(filepath)
@@ -70,251 +592,287 @@ class DocumentParser:
             else:
                 logger.warning(f"Unsupported file type: {ext}")
                 return ""
+        except INFRASTRUCTURE_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error parsing {filepath}: {str(e)}")
             return ""
 
-    def _parse_pdf(self, filepath: str) -> str:
-        """Extract text from PDF - digital first, then multi-pass OCR"""
-        text = ""
+    def _parse_pdf(self, filepath) -> str:
+        """
+        Extract text from PDF - digital text per page, multi-pass OCR for pages without it
+        Pages are read lazily; once every stop label has appeared in the digital text,
+        the next page with a text layer is checked: if it starts another form (carries
+        section_label) reading continues, otherwise it and the remaining pages are neither
+        read nor OCR'd. Pages without a text layer never end reading - they are OCR'd.
+        """
         try:
             # Try digital text extraction first
-            with open(filepath, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    t = page.extract_text()
-                    if t: 
-                        text += t + "\n"
+            page_texts = []
+            scanned_pages = []
+            remaining_labels = list(self.stop_labels)
+            form_complete = False
+            page_count = 0
+            for page_num, page_count, page_text in self.text_backend.iter_pages(filepath):
+                scanned = len(page_text.strip()) < self.min_page_text_chars
+                if form_complete and not scanned:
+                    if missing_labels(page_text, [self.section_label]):
+                        break
+                    # Another plan form follows - read it as well
+                    remaining_labels = list(self.stop_labels)
+                    form_complete = False
+                
+                page_texts.append(page_text)
+                
+                # Only OCR pages whose text layer is empty or suspiciously short
+                if scanned:
+                    scanned_pages.append(page_num)
+                elif remaining_labels:
+                    remaining_labels = missing_labels(page_text, remaining_labels)
+                    form_complete = not remaining_labels
+            
+            self._parse_info.pages_read = {'pages_read': list(range(1, len(page_texts) + 1)),
+                                           'page_count': page_count}
+            if len(page_texts) < page_count:
+                logger.info(f"✓ All labels ({', '.join(self.stop_labels)}) found by page {len(page_texts)} "
+                            f"of {page_count} - skipping remaining pages")
+            
+            if not scanned_pages:
+                text = "".join(t + PAGE_BREAK for t in page_texts)
+                logger.info(f"✓ Extracted {len(text)} characters as digital text (no OCR needed)")
+                return text.rstrip()
             
-            # Only use OCR if text is empty or suspiciously short
-            if not text.strip() or len(text.strip()) < 10:
+            if len(scanned_pages) == page_count:
                 logger.info("Minimal/no digital text. Attempting Multi-Pass OCR...")
-                text = self._parse_pdf_with_multipass_ocr(filepath)
             else:
-                logger.info(f"✓ Extracted {len(text)} characters as digital text (no OCR needed)")
+                logger.info(f"Pages {scanned_pages} of {page_count} have no digital text. "
+                            f"Attempting Multi-Pass OCR on those pages only...")
+            
+            ocr_texts = self._ocr_pdf_pages(filepath, scanned_pages, page_count)
+            for page_num, page_text in zip(scanned_pages, ocr_texts):
+                page_texts[page_num - 1] = page_text
+            
+            text = "".join(t + PAGE_BREAK for t in page_texts)
                 
+        except INFRASTRUCTURE_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"PDF error: {str(e)}")
             text = self._parse_pdf_with_multipass_ocr(filepath)
         
-        return text.strip()
+        # rstrip only: stripping leading page breaks of blank first pages would renumber pages
+        return text.rstrip()
 
-    def _parse_pdf_with_multipass_ocr(self, filepath: str) -> str:
-        """Convert PDF to images and run multi-pass OCR"""
+    def _parse_pdf_with_multipass_ocr(self, filepath) -> str:
+        """Rasterize every PDF page one at a time and run multi-pass OCR"""
         try:
-            from pdf2image import convert_from_path
-            
-            # Convert at high DPI for better quality
-            logger.info("Converting PDF to images at 400 DPI...")
-            images = convert_from_path(filepath, dpi=400) 
-            
-            full_text = ""
-            for i, image in enumerate(images):
-                logger.info(f"Processing page {i+1}/{len(images)} with Multi-Pass OCR...")
-                page_text = self._perform_multipass_ocr(image, page_num=i+1)
-                full_text += page_text + "\n"
+            page_count = self.rasterizer.page_count(filepath)
+            page_texts = self._ocr_pdf_pages(filepath, list(range(1, page_count + 1)), page_count)
                 
-            return full_text
+            return "".join(page_text + PAGE_BREAK for page_text in page_texts)
+        except INFRASTRUCTURE_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Multi-Pass OCR failed: {str(e)}")
+            self._record_failure()
             return ""
 
-    def _parse_image_advanced(self, filepath: str) -> str:
-        """Parse image with multi-pass OCR"""
+    def _ocr_pdf_pages(self, filepath, page_numbers, page_count: int):
+        """OCR the given 1-based pages, serially or on page workers; returns texts in the same order"""
         try:
-            image = Image.open(filepath).convert("RGB")
-            return self._perform_multipass_ocr(image)
+            if self.page_workers > 1 and len(page_numbers) > 1:
+                if self.service is not None:
+                    # Pages are sent concurrently so the service can batch their lines together
+                    with ThreadPoolExecutor(max_workers=min(self.page_workers, len(page_numbers))) as pool:
+                        return list(pool.map(lambda n: self._ocr_pdf_page(filepath, n, page_count), page_numbers))
+                return self._ocr_pages_parallel(filepath, page_numbers, page_count)
+            return list(self._iter_pdf_page_texts(filepath, page_numbers, page_count))
+        except INFRASTRUCTURE_ERRORS:
+            raise
         except Exception as e:
-            logger.error(f"Image parsing failed: {str(e)}")
-            return ""
+            logger.error(f"Multi-Pass OCR failed: {str(e)}")
+            self._record_failure()
+            return [""] * len(page_numbers)
 
-    def _enhance_image_v1_light(self, image):
-        """Enhancement Level 1: Light processing"""
-        img_array = np.array(image.convert('L'))
-        
-        # Denoise
-        img_array = cv2.fastNlMeansDenoising(img_array, h=10)
-        
-        # Increase contrast slightly
-        img_array = cv2.convertScaleAbs(img_array, alpha=1.3, beta=0)
-        
-        # Adaptive threshold
-        img_array = cv2.adaptiveThreshold(
-            img_array, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 11, 2
-        )
-        
-        return Image.fromarray(img_array)
-    
-    def _enhance_image_v2_aggressive(self, image):
-        """Enhancement Level 2: Aggressive processing"""
-        img_array = np.array(image.convert('L'))
-        
-        # Strong denoising
-        img_array = cv2.fastNlMeansDenoising(img_array, h=20)
-        
-        # High contrast
-        img_array = cv2.convertScaleAbs(img_array, alpha=2.0, beta=10)
-        
-        # Morphological operations
-        kernel = np.ones((2,2), np.uint8)
-        img_array = cv2.morphologyEx(img_array, cv2.MORPH_CLOSE, kernel)
-        
-        # Adaptive threshold with larger block
-        img_array = cv2.adaptiveThreshold(
-            img_array, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 15, 2
-        )
-        
-        # Dilation to thicken text
-        img_array = cv2.dilate(img_array, kernel, iterations=1)
-        
-        return Image.fromarray(img_array)
-    
-    def _enhance_image_v3_extreme(self, image):
-        """Enhancement Level 3: Extreme processing (last resort)"""
-        img_array = np.array(image.convert('L'))
+    def _iter_pdf_page_texts(self, filepath, page_numbers, page_count: int):
+        """Yield OCR text page by page so only one rasterized page is held in memory"""
+        for page_num in page_numbers:
+            yield self._ocr_pdf_page(filepath, page_num, page_count)
+
+    def _render_pdf_page(self, filepath, page_num: int, dpi: int):
+        """Rasterize a single PDF page"""
+        return self.rasterizer.render_page(filepath, page_num, dpi)
+
+    def _ocr_pdf_page(self, filepath, page_num: int, page_count: int) -> str:
+        """
+        OCR one PDF page with adaptive DPI
+        The page is rendered at initial_dpi first and only re-rendered at max_dpi
+        when the best pass confidence is below rerender_confidence.
+        A page that is a single embedded scan is OCR'd from that image directly.
+        """
+        self.governor.check_memory(f"page {page_num}")
+        scan = self.rasterizer.embedded_scan(filepath, page_num)
+        if scan is not None:
+            # Native resolution already carries all the detail a re-render could add
+            logger.info(f"Processing page {page_num}/{page_count} from its embedded scan with Multi-Pass OCR...")
+            return self._perform_multipass_ocr(scan, page_num=page_num)
         
-        # Maximum denoising
-        img_array = cv2.fastNlMeansDenoising(img_array, h=30)
+        dpi = min(self.initial_dpi, self.max_dpi)
+        logger.info(f"Processing page {page_num}/{page_count} at {dpi} DPI with Multi-Pass OCR...")
+        image = self._render_pdf_page(filepath, page_num, dpi)
+        text, confidence = self._perform_multipass_ocr(image, page_num=page_num, return_confidence=True)
+        del image
         
-        # Extreme contrast
-        img_array = cv2.convertScaleAbs(img_array, alpha=2.5, beta=20)
+        if confidence < self.rerender_confidence and dpi < self.max_dpi:
+            logger.info(f"Page {page_num} confidence {confidence:.2f} below {self.rerender_confidence:.2f} - "
+                        f"re-rendering at {self.max_dpi} DPI...")
+            image = self._render_pdf_page(filepath, page_num, self.max_dpi)
+            hi_text, hi_confidence = self._perform_multipass_ocr(image, page_num=page_num, return_confidence=True)
+            del image
+            if hi_confidence >= confidence:
+                text = hi_text
         
-        # Sharpening
-        kernel_sharp = np.array([[-1,-1,-1],
-                                 [-1, 9,-1],
-                                 [-1,-1,-1]])
-        img_array = cv2.filter2D(img_array, -1, kernel_sharp)
+        return text
+
+    def _ocr_pages_parallel(self, filepath, page_numbers, page_count: int):
+        """
+        Fan pages out to a pool of forked workers that share this parser's loaded models
+        Each worker rasterizes its own page. Falls back to serial OCR where fork is
+        unavailable (e.g. Windows). Returns page texts in page order.
+        """
+        global _page_worker_parser, _page_worker_source
         
-        # Otsu's thresholding (automatic)
-        _, img_array = cv2.threshold(img_array, 0, 255, 
-                                     cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.warning("Process fork unavailable - running page OCR serially")
+            return list(self._iter_pdf_page_texts(filepath, page_numbers, page_count))
         
-        # Heavy dilation
-        kernel = np.ones((3,3), np.uint8)
-        img_array = cv2.dilate(img_array, kernel, iterations=2)
+        workers = min(self.page_workers, len(page_numbers))
+        logger.info(f"Processing {len(page_numbers)} pages on {workers} OCR workers...")
         
-        return Image.fromarray(img_array)
+        # Load models before forking (never mid-warm-up) so workers share their weights copy-on-write
+        self.wait_until_ready()
+        self._ensure_models_loaded()
+        _page_worker_parser = self
+        _page_worker_source = filepath
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_page_worker,
+                initargs=(self.worker_torch_threads,)
+            ) as pool:
+                pages = [(page_num, page_count) for page_num in page_numbers]
+                texts = []
+                for text, degraded in pool.map(_ocr_page_in_worker, pages):
+                    if degraded:
+                        self._record_failure()
+                    texts.append(text)
+                return texts
+        finally:
+            _page_worker_parser = None
+            _page_worker_source = None
 
-    def _remove_horizontal_lines(self, image):
-        """Remove notebook lines using morphological operations"""
+    def _parse_image_advanced(self, filepath) -> str:
+        """Parse image with multi-pass OCR"""
         try:
-            img_array = np.array(image.convert('L'))
-            
-            # Inverse binary threshold
-            thresh = cv2.threshold(img_array, 0, 255, 
-                                  cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-            
-            # Detect horizontal lines
-            horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
-            detected_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, 
-                                             horizontal_kernel, iterations=2)
-            
-            # Remove detected lines
-            cnts = cv2.findContours(detected_lines, cv2.RETR_EXTERNAL, 
-                                   cv2.CHAIN_APPROX_SIMPLE)
-            cnts = cnts[0] if len(cnts) == 2 else cnts[1]
-            
-            repaired_img = img_array.copy()
-            for c in cnts:
-                cv2.drawContours(repaired_img, [c], -1, (255, 255, 255), 2)
-                
-            return Image.fromarray(repaired_img)
+            return self._perform_multipass_ocr(self._load_image(filepath))
+        except INFRASTRUCTURE_ERRORS:
+            raise
         except Exception as e:
-            logger.warning(f"Line removal failed: {str(e)}")
-            return image
+            logger.error(f"Image parsing failed: {str(e)}")
+            return ""
 
-    def _perform_multipass_ocr(self, image, page_num=1):
+    @staticmethod
+    def _load_image(filepath) -> Image.Image:
+        """
+        RGB image from a path or in-memory Attachment
+        Attachment bytes are decoded with cv2.imdecode straight from the payload;
+        formats OpenCV cannot decode fall back to PIL over the same buffer.
+        """
+        if isinstance(filepath, Attachment):
+            array = cv2.imdecode(np.frombuffer(filepath.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if array is not None:
+                return Image.fromarray(cv2.cvtColor(array, cv2.COLOR_BGR2RGB))
+        with Image.open(readable(filepath)) as source:
+            return source.convert("RGB")
+
+    def _perform_multipass_ocr(self, image, page_num=1, return_confidence=False):
         """
         Multi-pass OCR with progressive enhancement
         Pass 1: Original image (light enhancement)
-        Pass 2: Aggressive enhancement
+        Pass 2: Aggressive enhancement (skipped once a pass reaches early_exit_confidence)
         Pass 3: Extreme enhancement
         Returns best result based on confidence/length
+        (as a (text, confidence) tuple when return_confidence is True)
         """
         
+        if self.service is not None:
+            text, confidence = self.service.ocr_page(image, page_num=page_num)
+            logger.info(f"✓ Page {page_num} OCR'd by OCR service: {len(text)} chars, confidence: {confidence:.2f}")
+            return (text, confidence) if return_confidence else text
+        
+        self.wait_until_ready()
+        self.governor.check_memory(f"page {page_num}")
         logger.info(f"=== Multi-Pass OCR Started (Page {page_num}) ===")
         
-        # Keep original
+        # Keep original (PIL for recognizer crops); greyscale/line removal/denoise happen once in the enhancer
         original_image = image.convert("RGB")
+        enhancer = PageEnhancer(original_image, denoiser=self.denoiser, denoise_strength=self.denoise_strength)
         
-        # Create debug directory
-        debug_dir = Path("./data/debug_images")
-        debug_dir.mkdir(parents=True, exist_ok=True)
+        if self.escalation_mode == 'region':
+            return self._perform_region_escalation_ocr(enhancer, original_image, page_num, return_confidence)
+        
+        # Recognition results shared across passes (only in 'merged' detection mode)
+        line_cache = [] if self.detection_mode == 'merged' else None
+        
+        # Optionally prepare enhanced images on a thread pool ahead of OCR (cv2 releases the GIL)
+        enhance_pool = ThreadPoolExecutor(max_workers=3) if self.parallel_enhancement else None
+        prepared = {}
+        if enhance_pool:
+            for pass_name in ('light', 'aggressive'):
+                prepared[pass_name] = enhance_pool.submit(enhancer.variant, pass_name)
         
         results = []
         
-        # ==========================================
-        # PASS 1: Light Enhancement
-        # ==========================================
-        logger.info("Pass 1: Light enhancement...")
         try:
-            enhanced_v1 = self._enhance_image_v1_light(original_image)
-            enhanced_v1 = self._remove_horizontal_lines(enhanced_v1)
-            enhanced_v1.save(debug_dir / f"page_{page_num}_pass1_light.png")
+            # ==========================================
+            # PASS 1: Light Enhancement
+            # ==========================================
+            logger.info("Pass 1: Light enhancement...")
+            self._run_pass(1, 'light', enhancer, original_image, page_num, line_cache, prepared, results)
             
-            text_v1 = self._run_ocr_engines(enhanced_v1, original_image)
-            results.append({
-                'text': text_v1,
-                'length': len(text_v1),
-                'pass': 'light',
-                'confidence': self._calculate_confidence(text_v1)
-            })
-            logger.info(f"Pass 1 result: {len(text_v1)} chars, confidence: {results[0]['confidence']:.2f}")
-        except Exception as e:
-            logger.error(f"Pass 1 failed: {str(e)}")
-        
-        # ==========================================
-        # PASS 2: Aggressive Enhancement
-        # ==========================================
-        logger.info("Pass 2: Aggressive enhancement...")
-        try:
-            enhanced_v2 = self._enhance_image_v2_aggressive(original_image)
-            enhanced_v2 = self._remove_horizontal_lines(enhanced_v2)
-            enhanced_v2.save(debug_dir / f"page_{page_num}_pass2_aggressive.png")
+            # Start extreme preprocessing early if pass 1 already looks poor
+            if enhance_pool and self._needs_extreme_pass(results):
+                prepared['extreme'] = enhance_pool.submit(enhancer.variant, 'extreme')
             
-            text_v2 = self._run_ocr_engines(enhanced_v2, original_image)
-            results.append({
-                'text': text_v2,
-                'length': len(text_v2),
-                'pass': 'aggressive',
-                'confidence': self._calculate_confidence(text_v2)
-            })
-            logger.info(f"Pass 2 result: {len(text_v2)} chars, confidence: {results[1]['confidence']:.2f}")
-        except Exception as e:
-            logger.error(f"Pass 2 failed: {str(e)}")
-        
-        # ==========================================
-        # PASS 3: Extreme Enhancement (if needed)
-        # ==========================================
-        # Only run if first two passes gave poor results
-        if all(r['length'] < 20 or r['confidence'] < 0.5 for r in results):
-            logger.info("Pass 3: Extreme enhancement (poor results so far)...")
-            try:
-                enhanced_v3 = self._enhance_image_v3_extreme(original_image)
-                enhanced_v3 = self._remove_horizontal_lines(enhanced_v3)
-                enhanced_v3.save(debug_dir / f"page_{page_num}_pass3_extreme.png")
-                
-                text_v3 = self._run_ocr_engines(enhanced_v3, original_image)
-                results.append({
-                    'text': text_v3,
-                    'length': len(text_v3),
-                    'pass': 'extreme',
-                    'confidence': self._calculate_confidence(text_v3)
-                })
-                logger.info(f"Pass 3 result: {len(text_v3)} chars, confidence: {results[2]['confidence']:.2f}")
-            except Exception as e:
-                logger.error(f"Pass 3 failed: {str(e)}")
+            # ==========================================
+            # PASS 2: Aggressive Enhancement
+            # ==========================================
+            if self._reached_early_exit(results):
+                logger.info(f"Skipping remaining passes (confidence >= {self.early_exit_confidence:.2f})")
+            else:
+                logger.info("Pass 2: Aggressive enhancement...")
+                self.governor.check_memory(f"page {page_num}, pass 2")
+                self._run_pass(2, 'aggressive', enhancer, original_image, page_num, line_cache, prepared, results)
+            
+                # ==========================================
+                # PASS 3: Extreme Enhancement (if needed)
+                # ==========================================
+                # Only run if first two passes gave poor results
+                if self._needs_extreme_pass(results):
+                    logger.info("Pass 3: Extreme enhancement (poor results so far)...")
+                    self.governor.check_memory(f"page {page_num}, pass 3")
+                    self._run_pass(3, 'extreme', enhancer, original_image, page_num, line_cache, prepared, results)
+        finally:
+            if enhance_pool:
+                enhance_pool.shutdown(wait=False, cancel_futures=True)
         
         # ==========================================
         # Select Best Result
         # ==========================================
         if not results:
             logger.error("All OCR passes failed!")
-            return ""
+            return ("", 0.0) if return_confidence else ""
         
         # Choose result with best confidence score
         best_result = max(results, key=lambda x: x['confidence'])
@@ -323,95 +881,508 @@ class DocumentParser:
                    f"{best_result['length']} chars, confidence: {best_result['confidence']:.2f}")
         logger.info(f"=== Multi-Pass OCR Complete (Page {page_num}) ===\n")
         
+        if return_confidence:
+            return best_result['text'], best_result['confidence']
         return best_result['text']
 
-    def _run_ocr_engines(self, clean_image, original_image):
-        """Run multiple OCR engines and combine results"""
+    def _perform_region_escalation_ocr(self, enhancer, original_image, page_num=1, return_confidence=False):
+        """
+        Region-level escalation
+        Pass 1 reads the whole page with light enhancement; only lines whose confidence is
+        below region_confidence are re-enhanced (aggressive, then extreme) and re-recognized.
+        """
+        logger.info("Pass 1: Light enhancement (region escalation)...")
+        try:
+            enhanced = enhancer.variant('light')
+            self.debug_writer.capture(enhanced, f"page_{page_num}_pass1_light")
+            lines = self._detect_and_recognize(enhanced, original_image, original_grey=enhancer.grey)
+        except Exception as e:
+            logger.error(f"Pass 1 failed: {str(e)}")
+            self._record_failure()
+            lines = []
+        
+        for pass_name in ('aggressive', 'extreme'):
+            low = [i for i, line in enumerate(lines) if line['confidence'] < self.region_confidence]
+            if not low:
+                break
+            
+            logger.info(f"Re-OCR {len(low)}/{len(lines)} low-confidence region(s) with {pass_name} enhancement...")
+            try:
+                crops = []
+                for i in low:
+                    left, top, right, bottom = lines[i]['rect']
+                    region = enhance_array(
+                        enhancer.line_free[top:bottom, left:right],
+                        pass_name,
+                        denoised=enhancer.denoised[top:bottom, left:right]
+                    )
+                    crops.append(Image.fromarray(region).convert("RGB"))
+                
+                texts, confidences = self._recognize_crops(crops)
+                improved = 0
+                for i, text, confidence in zip(low, texts, confidences):
+                    if text and confidence > lines[i]['confidence']:
+                        lines[i] = {'rect': lines[i]['rect'], 'text': text, 'confidence': confidence}
+                        improved += 1
+                logger.info(f"{pass_name.capitalize()} re-OCR improved {improved}/{len(low)} region(s)")
+            except Exception as e:
+                logger.error(f"Region re-OCR ({pass_name}) failed: {str(e)}")
+                self._record_failure()
+        
+        text = "\n".join(line['text'] for line in lines if line['text'])
+        confidence = self._calculate_confidence(text)
+        
+        logger.info(f"✓ Region escalation result: {len(text)} chars, confidence: {confidence:.2f}")
+        logger.info(f"=== Multi-Pass OCR Complete (Page {page_num}) ===\n")
+        
+        if return_confidence:
+            return text, confidence
+        return text
+
+    def _run_pass(self, pass_num, pass_name, enhancer, original_image, page_num, line_cache, prepared, results):
+        """Enhance (or collect the prefetched enhancement), OCR and score one pass into results"""
+        try:
+            # Take ownership of the prefetched image so it is freed as soon as this pass ends
+            if pass_name in prepared:
+                enhanced = prepared.pop(pass_name).result()
+            else:
+                enhanced = enhancer.variant(pass_name)
+            self.debug_writer.capture(enhanced, f"page_{page_num}_pass{pass_num}_{pass_name}")
+            
+            text = self._run_ocr_engines(enhanced, original_image, line_cache, original_grey=enhancer.grey)
+            results.append({
+                'text': text,
+                'length': len(text),
+                'pass': pass_name,
+                'confidence': self._calculate_confidence(text)
+            })
+            logger.info(f"Pass {pass_num} result: {len(text)} chars, confidence: {results[-1]['confidence']:.2f}")
+        except Exception as e:
+            logger.error(f"Pass {pass_num} failed: {str(e)}")
+            self._record_failure()
+
+    def _reached_early_exit(self, results):
+        """True once any pass scores at or above early_exit_confidence"""
+        return any(r['confidence'] >= self.early_exit_confidence for r in results)
+
+    @staticmethod
+    def _needs_extreme_pass(results):
+        """Extreme enhancement is only worth it when every pass so far was poor"""
+        return all(r['length'] < 20 or r['confidence'] < 0.5 for r in results)
+
+    def _run_ocr_engines(self, clean_image, original_image, line_cache=None, original_grey=None):
+        """
+        Run multiple OCR engines and combine results
+        
+        Args:
+            clean_image: Enhanced greyscale array (or PIL image) used for text detection
+            original_image: PIL image that line crops are recognized from
+            line_cache: Optional per-page list of line dicts from earlier passes;
+                        boxes matching a cached rect reuse its text instead of being re-recognized
+            original_grey: Optional greyscale array of original_image, to avoid reconverting it
+        """
+        lines = self._detect_and_recognize(clean_image, original_image, line_cache, original_grey)
+        return "\n".join(line['text'] for line in lines if line['text'])
+
+    def _detect_and_recognize(self, clean_image, original_image, line_cache=None, original_grey=None):
+        """
+        Detect text regions on clean_image and recognize them from original_image
+        
+        Returns:
+            List of {'rect', 'text', 'confidence'} dicts in reading order
+        """
         
         # Detect text regions using clean image
-        img_array_clean = np.array(clean_image.convert("RGB"))
-        boxes = self.reader.readtext(img_array_clean, paragraph=False)
+        with torch.inference_mode():
+            boxes = self.reader.readtext(to_grayscale_array(clean_image), paragraph=False)
         
         if not boxes:
             logger.warning("No text regions detected")
-            return ""
+            return []
         
         logger.info(f"Detected {len(boxes)} text regions")
         
+        # Merge word boxes on the same baseline into line boxes before recognition
+        if self.box_grouping == 'line':
+            boxes = self._group_boxes_into_lines(boxes)
+            logger.info(f"Grouped into {len(boxes)} line region(s)")
+        
         # Sort top-to-bottom, left-to-right
         boxes.sort(key=lambda x: (x[0][0][1], x[0][0][0]))
         
-        detected_lines = []
+        rects = [self._bbox_to_crop_rect(bbox, image_size=original_image.size) for bbox, _, _ in boxes]
+        lines = [None] * len(boxes)
         
-        for bbox, _, confidence in boxes:
-            (tl, tr, br, bl) = bbox
-            top = max(0, int(min(tl[1], tr[1])) - 5)
-            bottom = int(max(bl[1], br[1])) + 5
-            left = max(0, int(min(tl[0], bl[0])) - 5)
-            right = int(max(tr[0], br[0])) + 5
-            
-            # Crop from ORIGINAL image
-            line_crop = original_image.crop((left, top, right, bottom))
-            
-            # Run multiple OCR engines
-            results = []
+        # Reuse lines already recognized by an earlier pass on this page
+        if line_cache is not None:
+            for i, rect in enumerate(rects):
+                lines[i] = self._find_cached_line(line_cache, rect)
+        
+        new_indices = [i for i, line in enumerate(lines) if line is None]
+        if line_cache is not None:
+            logger.info(f"Reusing {len(boxes) - len(new_indices)} cached line(s), "
+                        f"recognizing {len(new_indices)} new line(s)")
+        
+        if new_indices:
+            # Crop new lines from ORIGINAL image up front so engines can batch them
+            line_crops = [original_image.crop(rects[i]) for i in new_indices]
             
-            # Engine 1: TrOCR Base
-            try:
-                text_base = self._run_trocr(line_crop, self.processor_base, self.model_base)
-                if text_base:
-                    results.append(text_base)
-            except Exception as e:
-                logger.debug(f"TrOCR base failed: {str(e)}")
+            if self.engine_mode == 'cascade':
+                # EasyOCR already read these boxes during detection
+                easy_texts = [boxes[i][1].strip() for i in new_indices]
+                easy_confidences = [float(boxes[i][2]) if boxes[i][1].strip() else 0.0 for i in new_indices]
+                new_texts, new_confidences = self._recognize_cascade(line_crops, easy_texts, easy_confidences)
+            else:
+                if original_grey is None:
+                    original_grey = to_grayscale_array(original_image)
+                easy_texts, easy_confidences = self._run_easyocr_recognize(
+                    line_crops, original_grey, [rects[i] for i in new_indices]
+                )
+                new_texts, new_confidences = self._recognize_ensemble(line_crops, easy_texts, easy_confidences)
             
-            # Engine 2: TrOCR Large (if available)
-            if self.has_large_model:
-                try:
-                    text_large = self._run_trocr(line_crop, self.processor_large, self.model_large)
-                    if text_large:
-                        results.append(text_large)
-                except Exception as e:
-                    logger.debug(f"TrOCR large failed: {str(e)}")
+            for i, text, confidence in zip(new_indices, new_texts, new_confidences):
+                lines[i] = {'rect': rects[i], 'text': text, 'confidence': confidence}
+                if line_cache is not None:
+                    line_cache.append(lines[i])
+        
+        return lines
+
+    def _group_boxes_into_lines(self, boxes):
+        """
+        Merge EasyOCR word boxes into line boxes
+        Duplicate/nested boxes are dropped first; remaining boxes that overlap vertically
+        and sit within line_gap_ratio * line height of each other are joined left-to-right.
+        Merged boxes keep EasyOCR's (quad, text, confidence) shape, with the lowest word confidence.
+        """
+        words = []
+        for bbox, text, conf in boxes:
+            xs = [p[0] for p in bbox]
+            ys = [p[1] for p in bbox]
+            words.append({'rect': (min(xs), min(ys), max(xs), max(ys)), 'text': text, 'confidence': float(conf)})
+        
+        # Drop duplicates and boxes nested inside a larger one
+        words.sort(key=lambda w: (w['rect'][2] - w['rect'][0]) * (w['rect'][3] - w['rect'][1]), reverse=True)
+        kept = []
+        for word in words:
+            if not any(self._rect_containment(word['rect'], k['rect']) >= 0.9 for k in kept):
+                kept.append(word)
+        
+        # Greedily attach each word to a line on the same baseline
+        lines = []
+        for word in sorted(kept, key=lambda w: (w['rect'][1], w['rect'][0])):
+            l, t, r, b = word['rect']
+            height = max(1, b - t)
+            best_line, best_gap = None, None
+            for line in lines:
+                ll, lt, lr, lb = line['rect']
+                overlap = min(b, lb) - max(t, lt)
+                if overlap < 0.5 * min(height, lb - lt):
+                    continue
+                gap = max(0, l - lr, ll - r)
+                if gap <= self.line_gap_ratio * max(height, lb - lt) and (best_gap is None or gap < best_gap):
+                    best_line, best_gap = line, gap
             
-            # Engine 3: EasyOCR
-            try:
-                easy_result = self.reader.readtext(np.array(line_crop))
-                if easy_result:
-                    text_easy = ' '.join([text for (_, text, _) in easy_result])
-                    if text_easy:
-                        results.append(text_easy)
-            except Exception as e:
-                logger.debug(f"EasyOCR failed: {str(e)}")
+            if best_line is None:
+                lines.append({'rect': word['rect'], 'words': [word]})
+            else:
+                ll, lt, lr, lb = best_line['rect']
+                best_line['rect'] = (min(l, ll), min(t, lt), max(r, lr), max(b, lb))
+                best_line['words'].append(word)
+        
+        merged = []
+        for line in lines:
+            l, t, r, b = line['rect']
+            line_words = sorted(line['words'], key=lambda w: w['rect'][0])
+            text = ' '.join(w['text'] for w in line_words if w['text'])
+            confidence = min(w['confidence'] for w in line_words)
+            merged.append(([[l, t], [r, t], [r, b], [l, b]], text, confidence))
+        return merged
+
+    @staticmethod
+    def _rect_containment(inner, outer):
+        """Fraction of inner's area that lies inside outer"""
+        inter_w = min(inner[2], outer[2]) - max(inner[0], outer[0])
+        inter_h = min(inner[3], outer[3]) - max(inner[1], outer[1])
+        area = (inner[2] - inner[0]) * (inner[3] - inner[1])
+        if inter_w <= 0 or inter_h <= 0 or area <= 0:
+            return 0.0
+        return (inter_w * inter_h) / area
+
+    def _recognize_crops(self, line_crops):
+        """Recognize standalone crops (no page context) with the configured engine mode"""
+        if self.service is not None:
+            return self.service.recognize_crops(line_crops)
+        easy_texts, easy_confidences = self._run_easyocr_recognize(line_crops)
+        if self.engine_mode == 'cascade':
+            return self._recognize_cascade(line_crops, easy_texts, easy_confidences)
+        return self._recognize_ensemble(line_crops, easy_texts, easy_confidences)
+
+    def _find_cached_line(self, line_cache, rect):
+        """Return the cached line whose rect best overlaps rect at or above box_match_iou, else None"""
+        best_line, best_iou = None, self.box_match_iou
+        for cached_line in line_cache:
+            iou = self._rect_iou(rect, cached_line['rect'])
+            if iou >= best_iou:
+                best_line, best_iou = cached_line, iou
+        return best_line
+
+    @staticmethod
+    def _rect_iou(a, b):
+        """Intersection-over-union of two (left, top, right, bottom) rects"""
+        inter_w = min(a[2], b[2]) - max(a[0], b[0])
+        inter_h = min(a[3], b[3]) - max(a[1], b[1])
+        if inter_w <= 0 or inter_h <= 0:
+            return 0.0
+        inter = inter_w * inter_h
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return inter / union if union > 0 else 0.0
+
+    def _recognize_ensemble(self, line_crops, easy_texts, easy_confidences):
+        """
+        Run every engine on every line crop and vote
+        A line's confidence is 1.0 when at least two engines agree, otherwise EasyOCR's own confidence.
+        
+        Returns:
+            (texts, confidences), one per crop ("" if unread)
+        """
+        
+        # Engine 1: TrOCR Base (batched)
+        texts_base = self._run_trocr_batch(line_crops, *self._trocr(TROCR_BASE))
+        
+        # Engine 2: TrOCR Large (batched, if available)
+        if self.has_large_model:
+            texts_large = self._run_trocr_batch(line_crops, *self._trocr(TROCR_LARGE))
+        else:
+            texts_large = [""] * len(line_crops)
+        
+        # Engine 3: EasyOCR (recognized by the caller without re-running detection)
+        detected_lines = []
+        confidences = []
+        
+        for text_base, text_large, text_easy, conf_easy in zip(texts_base, texts_large, easy_texts, easy_confidences):
+            results = [t for t in (text_base, text_large, text_easy) if t]
             
             # Voting: Choose most common result or longest if no agreement
             if results:
-                if len(results) >= 2:
-                    # Check for agreement
-                    counter = Counter(results)
-                    most_common = counter.most_common(1)[0]
-                    if most_common[1] >= 2:  # At least 2 engines agree
-                        final_text = most_common[0]
-                    else:
-                        final_text = max(results, key=len)  # Choose longest
-                else:
-                    final_text = results[0]
+                final_text = self._vote(results)
+                agreed = Counter(results).most_common(1)[0][1] >= 2
+                confidence = 1.0 if agreed else conf_easy
                 
                 # Apply post-processing corrections
                 final_text = self._apply_corrections(final_text)
-                detected_lines.append(final_text)
                 logger.debug(f"OCR result: '{final_text}'")
+            else:
+                final_text, confidence = "", 0.0
+            detected_lines.append(final_text)
+            confidences.append(confidence)
+        
+        return detected_lines, confidences
+
+    def _run_easyocr_recognize(self, line_crops, original_grey=None, rects=None):
+        """
+        Run EasyOCR's recognizer without re-running detection
+        With original_grey/rects, all known boxes are recognized in one call on the page;
+        otherwise (or if that fails) each crop is recognized as a single region.
+        
+        Returns:
+            (texts, confidences), one per crop in input order
+        """
+        if original_grey is not None and rects:
+            try:
+                horizontal_list = [[left, right, top, bottom] for (left, top, right, bottom) in rects]
+                with torch.inference_mode():
+                    recognized = self.reader.recognize(
+                        original_grey,
+                        horizontal_list=horizontal_list,
+                        free_list=[],
+                        batch_size=self.easyocr_batch_size,
+                        detail=1
+                    )
+                
+                # EasyOCR re-sorts its output by position, so map results back by box
+                by_rect = {}
+                for box, text, conf in recognized:
+                    (x_min, y_min), _, (x_max, y_max), _ = box
+                    by_rect[(int(x_min), int(y_min), int(x_max), int(y_max))] = (text.strip(), float(conf))
+                results = [by_rect.get(rect, ("", 0.0)) for rect in rects]
+                return [r[0] for r in results], [r[1] for r in results]
+            except Exception as e:
+                logger.debug(f"EasyOCR bulk recognize failed, falling back to per-crop recognize: {str(e)}")
         
-        return "\n".join(detected_lines)
+        texts, confidences = [], []
+        for line_crop in line_crops:
+            try:
+                easy_result = self.reader.recognize(to_grayscale_array(line_crop), detail=1)
+                text = ' '.join([text for (_, text, _) in easy_result]).strip()
+                conf = min((float(c) for (_, _, c) in easy_result), default=0.0)
+                texts.append(text)
+                confidences.append(conf if text else 0.0)
+            except Exception as e:
+                logger.debug(f"EasyOCR failed: {str(e)}")
+                self._record_failure()
+                texts.append("")
+                confidences.append(0.0)
+        return texts, confidences
+
+    def _recognize_cascade(self, line_crops, easy_texts, easy_confidences):
+        """
+        Confidence-gated cascade: EasyOCR -> TrOCR base -> TrOCR large
+        Lines are only escalated to the next engine while their best confidence
+        is below cascade_threshold; each line keeps its highest-confidence text.
+        
+        Returns:
+            (texts, confidences), one per crop ("" if unread)
+        """
+        texts = list(easy_texts)
+        confidences = list(easy_confidences)
+        accepted_by = ['easyocr'] * len(texts)
+        tier_runs = Counter({'easyocr': len(texts)})
+        
+        pending = [i for i, conf in enumerate(confidences) if conf < self.cascade_threshold]
+        
+        # Each tier's model is only fetched (and loaded, on first use) if lines are still pending
+        tiers = [('trocr_base', TROCR_BASE)]
+        if self.use_large_model:
+            tiers.append(('trocr_large', TROCR_LARGE))
+        for tier, model_name in tiers:
+            if not pending:
+                continue
+            processor, model = self._trocr(model_name)
+            if model is None:
+                continue
+            
+            tier_runs[tier] += len(pending)
+            tier_texts, tier_confidences = self._run_trocr_batch(
+                [line_crops[i] for i in pending], processor, model, with_confidence=True
+            )
+            
+            still_pending = []
+            for i, text, conf in zip(pending, tier_texts, tier_confidences):
+                if text and conf > confidences[i]:
+                    texts[i], confidences[i], accepted_by[i] = text, conf, tier
+                if confidences[i] < self.cascade_threshold:
+                    still_pending.append(i)
+            pending = still_pending
+        
+        accepted = Counter(accepted_by)
+        self.cascade_stats['lines'] += len(texts)
+        for tier in ('easyocr', 'trocr_base', 'trocr_large'):
+            self.cascade_stats[f'{tier}_runs'] += tier_runs[tier]
+            self.cascade_stats[f'{tier}_accepted'] += accepted[tier]
+        
+        logger.info(f"Cascade: {len(texts)} lines | "
+                    f"trocr_base needed for {tier_runs['trocr_base']}, "
+                    f"trocr_large needed for {tier_runs['trocr_large']} | "
+                    f"accepted easyocr={accepted['easyocr']}, "
+                    f"trocr_base={accepted['trocr_base']}, trocr_large={accepted['trocr_large']}")
+        
+        detected_lines = []
+        for text in texts:
+            final_text = self._apply_corrections(text) if text else ""
+            if final_text:
+                logger.debug(f"OCR result: '{final_text}'")
+            detected_lines.append(final_text)
+        
+        return detected_lines, confidences
+
+    @staticmethod
+    def _bbox_to_crop_rect(bbox, margin=5, image_size=None):
+        """Convert an EasyOCR quadrilateral into a padded (left, top, right, bottom) crop rect"""
+        (tl, tr, br, bl) = bbox
+        top = max(0, int(min(tl[1], tr[1])) - margin)
+        bottom = int(max(bl[1], br[1])) + margin
+        left = max(0, int(min(tl[0], bl[0])) - margin)
+        right = int(max(tr[0], br[0])) + margin
+        
+        # Clamp to the page so rects match the boxes EasyOCR reports back
+        if image_size:
+            right = min(right, image_size[0])
+            bottom = min(bottom, image_size[1])
+        return (left, top, right, bottom)
+
+    @staticmethod
+    def _vote(results):
+        """Choose most common engine result, or the longest if engines disagree"""
+        if len(results) >= 2:
+            # Check for agreement
+            counter = Counter(results)
+            most_common = counter.most_common(1)[0]
+            if most_common[1] >= 2:  # At least 2 engines agree
+                return most_common[0]
+            return max(results, key=len)  # Choose longest
+        return results[0]
 
     def _run_trocr(self, image, processor, model):
         """Run TrOCR inference"""
-        try:
-            pixel_values = processor(images=image, return_tensors="pt").pixel_values.to(self.device)
-            generated_ids = model.generate(pixel_values, max_length=64)
-            text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-            return text.strip()
-        except:
-            return ""
+        return self._run_trocr_batch([image], processor, model)[0]
+
+    def _run_trocr_batch(self, images, processor, model, with_confidence=False):
+        """
+        Run TrOCR inference over many line crops
+        Inside the OCR service the crops are queued to the micro-batcher and decoded
+        together with crops from other concurrent jobs.
+        
+        Returns:
+            List of texts, or (texts, confidences) when with_confidence is True
+        """
+        if self.trocr_batcher is not None:
+            return self.trocr_batcher.submit(images, processor, model, with_confidence)
+        return self._generate_trocr(images, processor, model, with_confidence)
+
+    def _generate_trocr(self, images, processor, model, with_confidence=False):
+        """
+        TrOCR generate over line crops in this process
+        Crops are resized/padded together by the processor and decoded with one
+        generate call per chunk of trocr_batch_size. Output order matches input order.
+        """
+        texts = []
+        confidences = []
+        batch_size = max(1, self.trocr_batch_size)
+        
+        for start in range(0, len(images), batch_size):
+            chunk = [img.convert("RGB") for img in images[start:start + batch_size]]
+            try:
+                # No autograd bookkeeping: tensors are freed as soon as each chunk is decoded
+                with torch.inference_mode():
+                    pixel_values = processor(images=chunk, return_tensors="pt").pixel_values.to(self.device)
+                    outputs = model.generate(
+                        pixel_values,
+                        max_length=64,
+                        return_dict_in_generate=with_confidence,
+                        output_scores=with_confidence
+                    )
+                    sequences = outputs.sequences if with_confidence else outputs
+                    decoded = [t.strip() for t in processor.batch_decode(sequences, skip_special_tokens=True)]
+                    chunk_confidences = (
+                        list(self._sequence_confidences(model, outputs, processor)) if with_confidence else []
+                    )
+            except Exception as e:
+                logger.debug(f"TrOCR batch failed: {str(e)}")
+                self._record_failure()
+                decoded = [""] * len(chunk)
+                chunk_confidences = [0.0] * len(chunk)
+            
+            # Extended only once the whole chunk succeeded, so texts stay aligned with their crops
+            texts.extend(decoded)
+            if with_confidence:
+                confidences.extend(chunk_confidences)
+        
+        if with_confidence:
+            return texts, confidences
+        return texts
+
+    @staticmethod
+    def _sequence_confidences(model, outputs, processor):
+        """Geometric-mean token probability of each generated sequence"""
+        transition_scores = model.compute_transition_scores(
+            outputs.sequences, outputs.scores, normalize_logits=True
+        )
+        pad_token_id = processor.tokenizer.pad_token_id
+        generated = outputs.sequences[:, 1:]
+        mask = (generated != pad_token_id).float()
+        token_counts = mask.sum(dim=1).clamp(min=1)
+        mean_log_probs = (transition_scores * mask).sum(dim=1) / token_counts
+        return mean_log_probs.exp().tolist()
 
     def _apply_corrections(self, text):
         """Apply common OCR error corrections"""
@@ -468,33 +1439,37 @@ class DocumentParser:
     # =========================================================================
     
     @staticmethod
-    def _parse_docx(filepath: str) -> str:
+    def _parse_docx(filepath) -> str:
         try:
-            doc = Document(filepath)
+            doc = Document(readable(filepath))
             return "\n".join([p.text for p in doc.paragraphs]).strip()
         except:
             return ""
         
     @staticmethod
-    def _parse_excel(filepath: str) -> str:
+    def _parse_excel(filepath) -> str:
         try:
-            wb = load_workbook(filepath, read_only=True)
-            text = ""
-            for sheet in wb.worksheets:
-                for row in sheet.iter_rows(values_only=True):
-                    text += " | ".join([str(c) if c else "" for c in row]) + "\n"
-            return text.strip()
+            wb = load_workbook(readable(filepath), read_only=True)
+            try:
+                lines = [
+                    " | ".join([str(c) if c else "" for c in row])
+                    for sheet in wb.worksheets
+                    for row in sheet.iter_rows(values_only=True)
+                ]
+            finally:
+                wb.close()
+            return "\n".join(lines).strip()
         except:
             return ""
 
     @staticmethod
-    def _parse_txt(filepath: str) -> str:
+    def _parse_txt(filepath) -> str:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
+            with io.TextIOWrapper(open_source(filepath), encoding='utf-8') as f:
                 return f.read().strip()
         except:
             try:
-                with open(filepath, 'r', encoding='latin-1') as f:
+                with io.TextIOWrapper(open_source(filepath), encoding='latin-1') as f:
                     return f.read().strip()
             except:
                 return ""
\ No newline at end of file
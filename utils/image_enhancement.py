@@ -0,0 +1,180 @@
+import logging
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PASS_NAMES = ('light', 'aggressive', 'extreme')
+
+# Extra smoothing applied on top of the shared denoised base to stand in for
+# the stronger per-pass denoising (NLM h=20 / h=30) without re-running it
+_PASS_EXTRA_SMOOTHING = {'light': 0, 'aggressive': 3, 'extreme': 5}
+
+
+def to_grayscale_array(image) -> np.ndarray:
+    """Convert a PIL image or RGB/grey numpy array to a 2-D uint8 array"""
+    if isinstance(image, Image.Image):
+        return np.array(image.convert('L'))
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    return image
+
+
+def remove_horizontal_lines(img_array: np.ndarray) -> np.ndarray:
+    """Remove notebook lines using morphological operations"""
+    try:
+        # Inverse binary threshold
+        thresh = cv2.threshold(img_array, 0, 255,
+                               cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+
+        # Detect horizontal lines
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
+        detected_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN,
+                                          horizontal_kernel, iterations=2)
+
+        # Remove detected lines
+        cnts = cv2.findContours(detected_lines, cv2.RETR_EXTERNAL,
+                                cv2.CHAIN_APPROX_SIMPLE)
+        cnts = cnts[0] if len(cnts) == 2 else cnts[1]
+
+        repaired_img = img_array.copy()
+        for c in cnts:
+            cv2.drawContours(repaired_img, [c], -1, 255, 2)
+
+        return repaired_img
+    except Exception as e:
+        logger.warning(f"Line removal failed: {str(e)}")
+        return img_array
+
+
+def denoise(img_array: np.ndarray, method: str = 'nlm', strength: int = 10) -> np.ndarray:
+    """
+    Denoise a greyscale array
+
+    Args:
+        method: 'nlm' (fastNlMeansDenoising, best/slowest), 'bilateral', 'median' or 'none'
+        strength: NLM filter strength h (scaled for the cheaper filters)
+    """
+    if method == 'nlm':
+        return cv2.fastNlMeansDenoising(img_array, h=strength)
+    if method == 'bilateral':
+        return cv2.bilateralFilter(img_array, 5, strength * 5, strength * 5)
+    if method == 'median':
+        return cv2.medianBlur(img_array, 3)
+    return img_array
+
+
+def light_filter(denoised: np.ndarray) -> np.ndarray:
+    """Enhancement Level 1: Light processing"""
+    # Increase contrast slightly
+    img_array = cv2.convertScaleAbs(denoised, alpha=1.3, beta=0)
+
+    # Adaptive threshold
+    return cv2.adaptiveThreshold(
+        img_array, 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 11, 2
+    )
+
+
+def aggressive_filter(denoised: np.ndarray) -> np.ndarray:
+    """Enhancement Level 2: Aggressive processing"""
+    # High contrast
+    img_array = cv2.convertScaleAbs(denoised, alpha=2.0, beta=10)
+
+    # Morphological operations
+    kernel = np.ones((2, 2), np.uint8)
+    img_array = cv2.morphologyEx(img_array, cv2.MORPH_CLOSE, kernel)
+
+    # Adaptive threshold with larger block
+    img_array = cv2.adaptiveThreshold(
+        img_array, 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 15, 2
+    )
+
+    # Dilation to thicken text
+    return cv2.dilate(img_array, kernel, iterations=1)
+
+
+def extreme_filter(denoised: np.ndarray) -> np.ndarray:
+    """Enhancement Level 3: Extreme processing (last resort)"""
+    # Extreme contrast
+    img_array = cv2.convertScaleAbs(denoised, alpha=2.5, beta=20)
+
+    # Sharpening
+    kernel_sharp = np.array([[-1, -1, -1],
+                             [-1, 9, -1],
+                             [-1, -1, -1]])
+    img_array = cv2.filter2D(img_array, -1, kernel_sharp)
+
+    # Otsu's thresholding (automatic)
+    _, img_array = cv2.threshold(img_array, 0, 255,
+                                 cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Heavy dilation
+    kernel = np.ones((3, 3), np.uint8)
+    return cv2.dilate(img_array, kernel, iterations=2)
+
+
+PASS_FILTERS = {
+    'light': light_filter,
+    'aggressive': aggressive_filter,
+    'extreme': extreme_filter,
+}
+
+
+def enhance_array(img_array: np.ndarray, pass_name: str, denoised: np.ndarray = None,
+                  denoiser: str = 'nlm', strength: int = 10) -> np.ndarray:
+    """Apply one pass's smoothing and filter to a greyscale array (page or crop)"""
+    if denoised is None:
+        denoised = denoise(img_array, denoiser, strength)
+    extra = _PASS_EXTRA_SMOOTHING[pass_name]
+    if extra:
+        denoised = cv2.medianBlur(denoised, extra)
+    return PASS_FILTERS[pass_name](denoised)
+
+
+class PageEnhancer:
+    """
+    Numpy-native preprocessing for one page
+    The page is greyscaled, de-lined and denoised once; every pass variant is
+    derived from those shared intermediates. Safe to call from several threads.
+    """
+
+    def __init__(self, image, denoiser: str = 'nlm', denoise_strength: int = 10):
+        """
+        Args:
+            image: PIL image or numpy array of the page
+            denoiser: 'nlm', 'bilateral', 'median' or 'none'
+            denoise_strength: Filter strength for the shared denoised base
+        """
+        self.grey = to_grayscale_array(image)
+        self.denoiser = denoiser
+        self.denoise_strength = denoise_strength
+        self._line_free = None
+        self._denoised = None
+        self._lock = threading.Lock()
+
+    @property
+    def line_free(self) -> np.ndarray:
+        """Greyscale page with notebook lines removed (computed once)"""
+        with self._lock:
+            if self._line_free is None:
+                self._line_free = remove_horizontal_lines(self.grey)
+            return self._line_free
+
+    @property
+    def denoised(self) -> np.ndarray:
+        """Shared denoised base for every pass (computed once)"""
+        line_free = self.line_free
+        with self._lock:
+            if self._denoised is None:
+                self._denoised = denoise(line_free, self.denoiser, self.denoise_strength)
+            return self._denoised
+
+    def variant(self, pass_name: str) -> np.ndarray:
+        """Binarized image for a pass: 'light', 'aggressive' or 'extreme'"""
+        return enhance_array(self.line_free, pass_name, denoised=self.denoised)
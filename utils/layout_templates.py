@@ -0,0 +1,148 @@
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: str) -> str:
+    return ''.join(str(text).lower().split())
+
+
+def label_similarity(recognized: str, label: str) -> float:
+    """How well the start of a recognized region matches a template label (0-1)"""
+    if not label:
+        return 1.0
+    prefix = _normalize(recognized)[:len(_normalize(label))]
+    return SequenceMatcher(None, prefix, _normalize(label)).ratio()
+
+
+def strip_label(recognized: str, label: str) -> str:
+    """Remove a template label (and separators) from the start of a recognized region"""
+    text = recognized.strip()
+    if not label:
+        return text
+    # Walk past as many characters as the label occupies, ignoring spacing
+    wanted = len(_normalize(label))
+    seen = 0
+    for i, ch in enumerate(text):
+        if not ch.isspace():
+            seen += 1
+        if seen >= wanted:
+            return text[i + 1:].lstrip(' :-\t')
+    return ""
+
+
+class LayoutTemplateStore:
+    """
+    Persistent store of form layouts keyed by sender or form id
+    Each template maps a mandatory field to a normalized (0-1) region on page 1
+    and the label text expected at the start of that region, e.g.:
+        {"fields": {"name": {"rect": [0.1, 0.2, 0.6, 0.25], "label": "Name:"}}}
+    """
+
+    def __init__(self, store_path: str = './data/layout_templates.json'):
+        """
+        Initialize template store
+
+        Args:
+            store_path: JSON file holding all templates
+        """
+        self.store_path = Path(store_path)
+        self._lock = threading.Lock()
+        self._templates = self._load()
+        logger.info(f"Layout template store initialized - {len(self._templates)} template(s)")
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            if self.store_path.exists():
+                with open(self.store_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading layout templates: {str(e)}")
+        return {}
+
+    def _save(self):
+        """Write all templates atomically (caller holds the lock)"""
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.store_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._templates, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.store_path)
+
+    def get(self, template_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            return self._templates.get(template_id)
+
+    def register(self, template_id: str, fields: Dict[str, Dict[str, Any]], source: str = 'manual'):
+        """
+        Register (or replace) a template
+
+        Args:
+            template_id: Sender email or form identifier
+            fields: field -> {'rect': [left, top, right, bottom] as page fractions, 'label': str}
+            source: 'manual' or 'learned'
+        """
+        with self._lock:
+            self._templates[template_id] = {
+                'fields': fields,
+                'source': source,
+                'updated_at': datetime.now().isoformat()
+            }
+            self._save()
+        logger.info(f"Registered layout template '{template_id}' ({source}) with fields: {', '.join(fields)}")
+
+    def learn(self, template_id: str, page_lines: List[Dict[str, Any]], page_size,
+              extracted_data: Dict[str, str]) -> bool:
+        """
+        Learn field regions from a successful extraction
+
+        Args:
+            template_id: Sender email or form identifier
+            page_lines: OCR lines of page 1 as {'rect': (l, t, r, b), 'text': str}
+            page_size: (width, height) of the page the rects refer to
+            extracted_data: Validated field values
+
+        Returns:
+            True if every non-empty field value was located and the template was saved
+        """
+        width, height = page_size
+        fields = {}
+
+        for field, value in extracted_data.items():
+            if not value or not str(value).strip():
+                continue
+            target = _normalize(value)
+            literal = str(value).strip().lower()
+
+            for line in page_lines:
+                if target not in _normalize(line['text']):
+                    continue
+
+                # Label is whatever precedes the value on the same line
+                position = line['text'].lower().find(literal)
+                label = line['text'][:position].strip() if position > 0 else ""
+
+                l, t, r, b = line['rect']
+                fields[field] = {
+                    'rect': [round(l / width, 4), round(t / height, 4),
+                             round(r / width, 4), round(b / height, 4)],
+                    'label': label
+                }
+                break
+
+            if field not in fields:
+                logger.info(f"Could not locate '{field}' on page 1 - template not learned")
+                return False
+
+        if not any(f['label'] for f in fields.values()):
+            logger.info("No field labels found next to the values - template not learned")
+            return False
+
+        self.register(template_id, fields, source='learned')
+        return True
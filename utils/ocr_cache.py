@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, Any
+from .attachment import open_source
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """
+    Persistent content-addressed cache of parsed document text
+    Entries are keyed by SHA-256 of the attachment bytes plus the parser version,
+    stored one JSON file per entry, and evicted least-recently-used by total size.
+    """
+
+    def __init__(self, cache_path: str = './data/ocr_cache', max_size_mb: float = 256):
+        """
+        Initialize cache and index existing entries
+
+        Args:
+            cache_path: Directory holding cache entries
+            max_size_mb: Total size budget before least-recently-used entries are evicted
+        """
+        self.cache_path = Path(cache_path)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+
+        # key -> size in bytes, oldest access first
+        self._index = OrderedDict()
+        entries = sorted(self.cache_path.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        for entry in entries:
+            self._index[entry.stem] = entry.stat().st_size
+        self._total_bytes = sum(self._index.values())
+
+        logger.info(f"OCR cache initialized - {len(self._index)} entries, "
+                    f"{self._total_bytes / 1024 / 1024:.1f} MB at {cache_path}")
+
+    @staticmethod
+    def make_key(filepath, version: str) -> str:
+        """Hash attachment bytes (file path or in-memory Attachment) together with the parser/model version"""
+        digest = hashlib.sha256()
+        digest.update(version.encode('utf-8'))
+        with open_source(filepath) as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_path / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        """Return cached text for key, or None on a miss"""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+            entry_path = self._entry_path(key)
+            try:
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    text = json.load(f)['text']
+                os.utime(entry_path)  # Persist recency across restarts
+            except Exception as e:
+                logger.warning(f"Dropping unreadable OCR cache entry {key}: {str(e)}")
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str, source: str = None):
+        """Store text for key and evict old entries beyond the size budget"""
+        entry = {
+            'text': text,
+            'source_document': source,
+            'cached_at': datetime.now().isoformat()
+        }
+        payload = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+
+        with self._lock:
+            entry_path = self._entry_path(key)
+            tmp_path = entry_path.with_suffix('.tmp')
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, entry_path)
+            except Exception as e:
+                logger.warning(f"Failed to write OCR cache entry: {str(e)}")
+                return
+
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(payload)
+            self._total_bytes += len(payload)
+
+            while self._total_bytes > self.max_size_bytes and len(self._index) > 1:
+                oldest_key = next(iter(self._index))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        """Delete an entry (caller holds the lock)"""
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            self._entry_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'size_mb': round(self._total_bytes / 1024 / 1024, 2),
+                'max_size_mb': round(self.max_size_bytes / 1024 / 1024, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,226 @@
+import gc
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+import torch
+import easyocr
+from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+logger = logging.getLogger(__name__)
+
+TROCR_BASE = 'microsoft/trocr-base-handwritten'
+TROCR_LARGE = 'microsoft/trocr-large-handwritten'
+
+# pytorch: fp32 (default) | int8: dynamic quantization of Linear layers | onnx: ONNX Runtime export
+TROCR_BACKENDS = ('pytorch', 'int8', 'onnx')
+
+# Exported ONNX graphs are saved here and reused on later process starts
+ONNX_EXPORT_DIR = './data/onnx_models'
+
+# Fallback footprint estimate when an engine's parameters cannot be inspected
+_DEFAULT_ENGINE_MB = 500
+
+
+def _estimate_size_mb(*modules) -> float:
+    """Approximate in-memory size of torch modules from their parameters and buffers"""
+    total = 0
+    for module in modules:
+        try:
+            total += sum(p.numel() * p.element_size() for p in module.parameters())
+            total += sum(b.numel() * b.element_size() for b in module.buffers())
+        except Exception:
+            total += _DEFAULT_ENGINE_MB * 1024 * 1024
+    return total / 1024 / 1024
+
+
+class OCRModelRegistry:
+    """
+    Process-wide registry of OCR engines
+    Engines are loaded on first use, handed out by reference to every parser, and kept
+    in an LRU; when a memory budget is set, least-recently-used engines are evicted.
+    """
+
+    def __init__(self, device: str = None, max_memory_mb: float = None, onnx_export_dir: str = ONNX_EXPORT_DIR):
+        """
+        Initialize an empty registry
+
+        Args:
+            device: Torch device for TrOCR models (defaults to cuda when available)
+            max_memory_mb: Total engine footprint before LRU eviction (None = unbounded)
+            onnx_export_dir: Where exported ONNX TrOCR graphs are saved for reuse
+        """
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.max_memory_mb = max_memory_mb
+        self.onnx_export_dir = Path(onnx_export_dir)
+        self._lock = threading.RLock()
+        self._engines = OrderedDict()  # key -> {'engine': ..., 'size_mb': float}, oldest use first
+        self._failed_models = set()
+        self._fallbacks = {}  # (model_name, requested backend) -> backend actually loaded
+        self.loads = 0
+        self.evictions = 0
+
+    def set_memory_budget(self, max_memory_mb: float = None):
+        """Change the memory budget and evict down to it"""
+        with self._lock:
+            self.max_memory_mb = max_memory_mb
+            self._evict(keep=None)
+
+    def get_reader(self, languages=('en',)):
+        """Return the shared EasyOCR reader for a language set, loading it on first use"""
+        key = ('easyocr', tuple(languages))
+        with self._lock:
+            if key not in self._engines:
+                logger.info(f"Loading EasyOCR reader for {list(key[1])}...")
+                reader = easyocr.Reader(list(key[1]), gpu=self.device == "cuda")
+                size_mb = _estimate_size_mb(getattr(reader, 'detector', None), getattr(reader, 'recognizer', None))
+                self._add(key, reader, size_mb)
+            return self._use(key)
+
+    def get_trocr(self, model_name: str, backend: str = 'pytorch'):
+        """
+        Return the shared (processor, model) pair for a TrOCR checkpoint, loading it on first use
+
+        Args:
+            model_name: Hugging Face checkpoint name
+            backend: 'pytorch' (fp32), 'int8' (dynamic quantization, CPU only) or 'onnx' (ONNX Runtime)
+                     Falls back to 'pytorch' if the requested backend cannot be loaded.
+
+        Returns:
+            Tuple of (processor, model) or None if the model could not be loaded
+        """
+        if backend not in TROCR_BACKENDS:
+            logger.warning(f"Unknown TrOCR backend '{backend}', using 'pytorch'")
+            backend = 'pytorch'
+
+        with self._lock:
+            # A backend that failed once is not retried; its fallback is served directly
+            backend = self._fallbacks.get((model_name, backend), backend)
+            key = ('trocr', model_name, backend)
+            if key in self._failed_models:
+                return None
+
+            if key not in self._engines:
+                try:
+                    logger.info(f"Loading TrOCR model: {model_name} ({backend})...")
+                    processor = TrOCRProcessor.from_pretrained(model_name)
+                    model = self._load_trocr_model(model_name, backend)
+                    size_mb = _estimate_size_mb(model) if backend != 'onnx' else _DEFAULT_ENGINE_MB
+                    self._add(key, (processor, model), size_mb)
+                except Exception as e:
+                    if backend != 'pytorch':
+                        logger.warning(f"TrOCR backend '{backend}' unavailable for {model_name} "
+                                       f"({str(e)}) - falling back to pytorch")
+                        self._fallbacks[(model_name, backend)] = 'pytorch'
+                        return self.get_trocr(model_name, 'pytorch')
+
+                    logger.warning(f"Failed to load {model_name}: {str(e)}")
+                    self._failed_models.add(key)
+                    return None
+
+            return self._use(key)
+
+    def resolved_backend(self, model_name: str, backend: str) -> str:
+        """Backend actually serving model_name when backend is requested (differs after a fallback)"""
+        with self._lock:
+            return self._fallbacks.get((model_name, backend), backend)
+
+    def _load_trocr_model(self, model_name: str, backend: str):
+        """Load a TrOCR encoder/decoder for the requested inference backend"""
+        if backend == 'onnx':
+            from optimum.onnxruntime import ORTModelForVision2Seq
+            provider = "CUDAExecutionProvider" if self.device == "cuda" else "CPUExecutionProvider"
+            export_path = self.onnx_export_dir / model_name.replace('/', '--')
+            if export_path.exists():
+                return ORTModelForVision2Seq.from_pretrained(export_path, provider=provider)
+
+            logger.info(f"Exporting {model_name} to ONNX (saved to {export_path} for reuse)...")
+            model = ORTModelForVision2Seq.from_pretrained(model_name, export=True, provider=provider)
+            try:
+                model.save_pretrained(export_path)
+            except Exception as e:
+                logger.warning(f"Could not save ONNX export of {model_name}: {str(e)}")
+            return model
+
+        model = VisionEncoderDecoderModel.from_pretrained(model_name)
+        model.eval()
+
+        if backend == 'int8':
+            if self.device != "cpu":
+                raise RuntimeError("dynamic int8 quantization is CPU-only")
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        return model.to(self.device)
+
+    def _add(self, key, engine, size_mb: float):
+        """Register a freshly loaded engine and evict others beyond the budget (caller holds the lock)"""
+        self._engines[key] = {'engine': engine, 'size_mb': size_mb}
+        self.loads += 1
+        logger.info(f"✓ Loaded {self._describe(key)} (~{size_mb:.0f} MB, "
+                    f"{self.memory_mb:.0f} MB of engines resident)")
+        self._evict(keep=key)
+
+    def _use(self, key):
+        """Mark an engine most recently used and return it (caller holds the lock)"""
+        self._engines.move_to_end(key)
+        return self._engines[key]['engine']
+
+    def _evict(self, keep):
+        """Drop least-recently-used engines until within budget (caller holds the lock)"""
+        if self.max_memory_mb is None:
+            return
+
+        evicted = False
+        for key in list(self._engines):
+            if self.memory_mb <= self.max_memory_mb:
+                break
+            if key == keep:
+                continue
+            entry = self._engines.pop(key)
+            self.evictions += 1
+            evicted = True
+            logger.info(f"Evicted {self._describe(key)} (~{entry['size_mb']:.0f} MB) to stay within "
+                        f"{self.max_memory_mb:.0f} MB budget")
+
+        if evicted:
+            # Parsers only hold engines for the duration of a call, so memory is released here
+            gc.collect()
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+
+    @property
+    def memory_mb(self) -> float:
+        return sum(entry['size_mb'] for entry in self._engines.values())
+
+    @staticmethod
+    def _describe(key) -> str:
+        if key[0] == 'easyocr':
+            return f"EasyOCR reader {list(key[1])}"
+        return f"TrOCR {key[1]} ({key[2]})"
+
+    def get_status(self) -> dict:
+        """Get currently loaded engines"""
+        with self._lock:
+            return {
+                'device': self.device,
+                'engines': [self._describe(key) for key in self._engines],
+                'memory_mb': round(self.memory_mb, 1),
+                'max_memory_mb': self.max_memory_mb,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'failed_models': [self._describe(key) for key in self._failed_models],
+                'fallbacks': {f"{name} ({requested})": actual for (name, requested), actual in self._fallbacks.items()}
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> OCRModelRegistry:
+    """Return the process-wide model registry, creating it on first call"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = OCRModelRegistry()
+        return _registry
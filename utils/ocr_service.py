@@ -0,0 +1,341 @@
+"""
+Local OCR service
+Holds the OCR models in one long-lived process and serves page/crop OCR jobs
+from any number of DocumentParser clients over a Unix socket. TrOCR work from
+concurrent jobs is merged into dynamic micro-batches.
+
+Usage:
+    python -m utils.ocr_service [--socket ./data/ocr_service.sock]
+"""
+
+import os
+import stat
+import time
+import queue
+import logging
+import argparse
+import threading
+from multiprocessing.connection import Listener, Client, AuthenticationError
+import numpy as np
+from PIL import Image
+from .resource_governor import DocumentMemoryExceeded
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = './data/ocr_service.sock'
+
+
+class OCRServiceUnavailable(ConnectionError):
+    """The OCR service could not be reached - an infrastructure failure, not an unreadable document"""
+
+
+def _authkey_path(address: str) -> str:
+    return f"{address}.key"
+
+
+def _load_authkey(address: str, authkey: str = None, create: bool = False) -> bytes | None:
+    """
+    Connection authkey: the configured one, else the per-socket key file
+    The service creates the key file (owner read/write only) on start; clients read it.
+    """
+    if authkey:
+        return authkey.encode('utf-8')
+
+    key_path = _authkey_path(address)
+    if create:
+        key = os.urandom(32)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, stat.S_IRUSR | stat.S_IWUSR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        return key
+    try:
+        with open(key_path, 'rb') as f:
+            return f.read() or None
+    except FileNotFoundError:
+        return None
+
+
+class MicroBatcher:
+    """
+    Merges TrOCR requests from concurrent callers into shared generate batches
+    A batch is dispatched once max_batch crops are queued or max_latency_ms has
+    passed since its first request arrived, whichever comes first.
+    """
+
+    def __init__(self, run_batch, max_batch: int = 32, max_latency_ms: float = 20):
+        """
+        Args:
+            run_batch: fn(images, processor, model, with_confidence) doing the actual inference
+            max_batch: Crops per dispatched batch
+            max_latency_ms: Longest a request waits for others to join its batch
+        """
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max_latency_ms / 1000.0
+        self.batches = 0
+        self.crops = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._dispatch_loop, name="trocr-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, images, processor, model, with_confidence=False):
+        """Queue crops and block until their results are ready (same return shape as run_batch)"""
+        if not images:
+            return ([], []) if with_confidence else []
+        request = {
+            'images': list(images), 'processor': processor, 'model': model,
+            'with_confidence': with_confidence, 'done': threading.Event()
+        }
+        self._queue.put(request)
+        request['done'].wait()
+        if 'error' in request:
+            raise request['error']
+        return request['result']
+
+    def _dispatch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0]['images'])
+            deadline = time.monotonic() + self.max_latency
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request['images'])
+
+            # Requests can only share a generate call when they target the same model
+            groups = {}
+            for request in batch:
+                groups.setdefault((id(request['model']), request['with_confidence']), []).append(request)
+            for requests in groups.values():
+                self._run_group(requests)
+
+    def _run_group(self, requests):
+        first = requests[0]
+        images = [img for request in requests for img in request['images']]
+        try:
+            result = self.run_batch(images, first['processor'], first['model'], first['with_confidence'])
+            texts, confidences = result if first['with_confidence'] else (result, None)
+            self.batches += 1
+            self.crops += len(images)
+
+            offset = 0
+            for request in requests:
+                n = len(request['images'])
+                if first['with_confidence']:
+                    request['result'] = (texts[offset:offset + n], confidences[offset:offset + n])
+                else:
+                    request['result'] = texts[offset:offset + n]
+                offset += n
+        except Exception as e:
+            for request in requests:
+                request['error'] = e
+        finally:
+            for request in requests:
+                request['done'].set()
+
+
+class OCRService:
+    """
+    OCR server: one DocumentParser (and one copy of the models) shared by every client
+    The socket is open while models warm up; jobs wait for warm-up, status answers at once.
+    Clients must present the authkey before any request is unpickled.
+    Each client connection is served on its own thread; supported ops:
+        page   - multi-pass OCR of a page image -> (text, confidence)
+        crops  - recognize standalone crops -> (texts, confidences)
+        lines  - detected lines of a page -> [{'rect', 'text', 'confidence'}]
+        status - model registry and batching counters
+    """
+
+    def __init__(self, address: str = DEFAULT_SOCKET, ocr_config: dict = None,
+                 max_batch: int = 32, max_latency_ms: float = 20, authkey: str = None):
+        """
+        Initialize the service (models are warmed up in the background once serving)
+
+        Args:
+            address: Unix socket path to listen on
+            ocr_config: DocumentParser OCR config used inside the service
+            max_batch: Crops per cross-request TrOCR batch
+            max_latency_ms: Max wait for a batch to fill
+            authkey: Shared secret clients must present (default: random key in '<socket>.key')
+        """
+        from .document_parser import DocumentParser
+
+        self.address = address
+        self.authkey = authkey
+        ocr_config = dict(ocr_config or {})
+        for key in ('service_address', 'service_connect_timeout', 'service_authkey'):
+            ocr_config.pop(key, None)
+        ocr_config['cache_enabled'] = False  # Callers cache whole documents
+        self.parser = DocumentParser(ocr_config=ocr_config)
+        self.parser.trocr_batcher = MicroBatcher(self.parser._generate_trocr, max_batch, max_latency_ms)
+        self.jobs = 0
+
+    def serve_forever(self):
+        """Start warming up the models and accept clients until interrupted"""
+        self.parser.start_warmup()
+
+        if os.path.exists(self.address):
+            os.remove(self.address)  # Stale socket from a previous run
+        os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+        authkey = _load_authkey(self.address, self.authkey, create=True)
+
+        with Listener(self.address, family='AF_UNIX', authkey=authkey) as listener:
+            logger.info(f"✓ OCR service listening on {self.address} (jobs wait for model warm-up)")
+            while True:
+                try:
+                    conn = listener.accept()
+                except AuthenticationError:
+                    logger.warning("Rejected OCR service client with a wrong authkey")
+                    continue
+                threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _serve_client(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    # Tells the caller not to cache a result degraded by a failure (possibly a concurrent job's)
+                    failures = self.parser.failure_count
+                    result = self._handle(request)
+                    conn.send({'ok': True, 'result': result, 'degraded': self.parser.failure_count != failures})
+                except Exception as e:
+                    logger.error(f"OCR service job '{request.get('op')}' failed: {str(e)}")
+                    conn.send({'ok': False, 'error': str(e), 'error_type': type(e).__name__})
+
+    def _handle(self, request: dict):
+        op = request['op']
+        if op != 'status':
+            self.parser.wait_until_ready()
+        self.jobs += 1
+        if op == 'page':
+            image = Image.fromarray(request['image'])
+            return self.parser._perform_multipass_ocr(image, page_num=request.get('page_num', 1),
+                                                      return_confidence=True)
+        if op == 'crops':
+            return self.parser._recognize_crops([Image.fromarray(c) for c in request['crops']])
+        if op == 'lines':
+            return self.parser._page_lines(Image.fromarray(request['image']))
+        if op == 'status':
+            batcher = self.parser.trocr_batcher
+            return {
+                'ready': self.parser.is_ready,
+                'jobs': self.jobs,
+                'trocr_batches': batcher.batches,
+                'trocr_crops': batcher.crops,
+                'models': self.parser.models.get_status()
+            }
+        raise ValueError(f"Unknown OCR service op '{op}'")
+
+
+class OCRServiceClient:
+    """
+    Client used by DocumentParser when OCR runs in the OCR service
+    Each calling thread keeps its own connection, so concurrent documents
+    reach the service in parallel and can share its batches.
+    """
+
+    def __init__(self, address: str = DEFAULT_SOCKET, connect_timeout: float = 600, authkey: str = None):
+        """
+        Args:
+            address: Unix socket path of the OCR service
+            connect_timeout: Seconds to keep retrying while the service starts up
+                (only until it has once been found unreachable; after that each
+                connect is a single attempt until the service answers again)
+            authkey: Shared secret (default: read from the service's '<socket>.key')
+        """
+        self.address = address
+        self.connect_timeout = connect_timeout
+        self.authkey = authkey
+        self._local = threading.local()
+        self._unreachable = False  # Shared by all threads
+        self.degraded_responses = 0  # Results the service produced despite OCR failures
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        # Once the service is known to be down, fail fast instead of waiting per document
+        deadline = time.monotonic() + (0 if self._unreachable else self.connect_timeout)
+        while True:
+            authkey = _load_authkey(self.address, self.authkey)
+            try:
+                if authkey is None:
+                    raise FileNotFoundError(_authkey_path(self.address))
+                conn = Client(self.address, family='AF_UNIX', authkey=authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError, AuthenticationError) as e:
+                # Key and socket appear once the service starts; a stale key is replaced on restart
+                if time.monotonic() >= deadline:
+                    self._unreachable = True
+                    raise OCRServiceUnavailable(f"OCR service not reachable at {self.address}: {str(e)}")
+                time.sleep(0.5)
+        self._unreachable = False
+        self._local.conn = conn
+        return conn
+
+    def _call(self, request: dict):
+        conn = self._connection()
+        try:
+            conn.send(request)
+            response = conn.recv()
+        except (EOFError, OSError) as e:
+            # Service restarted - drop the dead connection so the next call reconnects
+            self._local.conn = None
+            raise OCRServiceUnavailable(f"OCR service connection lost: {str(e)}") from e
+        if not response['ok']:
+            if response.get('error_type') == DocumentMemoryExceeded.__name__:
+                raise DocumentMemoryExceeded(f"OCR service: {response['error']}")
+            raise RuntimeError(f"OCR service error: {response['error']}")
+        if response.get('degraded'):
+            with self._lock:
+                self.degraded_responses += 1
+        return response['result']
+
+    def ocr_page(self, image, page_num: int = 1):
+        """Multi-pass OCR of a page -> (text, confidence)"""
+        return self._call({'op': 'page', 'image': np.asarray(image.convert("RGB")), 'page_num': page_num})
+
+    def recognize_crops(self, crops):
+        """Recognize standalone crops -> (texts, confidences)"""
+        return self._call({'op': 'crops', 'crops': [np.asarray(c.convert("RGB")) for c in crops]})
+
+    def page_lines(self, image):
+        """Detected and recognized lines of a page"""
+        return self._call({'op': 'lines', 'image': np.asarray(image.convert("RGB"))})
+
+    def get_status(self) -> dict:
+        return self._call({'op': 'status'})
+
+
+if __name__ == "__main__":
+    from .ocr_settings import load_ocr_settings, build_ocr_config
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    arg_parser = argparse.ArgumentParser(description="Run the shared OCR service")
+    arg_parser.add_argument('--socket', default=None, help="Unix socket path (default: OCR_SERVICE_SOCKET)")
+    args = arg_parser.parse_args()
+
+    config = load_ocr_settings()
+    service = OCRService(
+        address=args.socket or config['ocr_service_socket'] or DEFAULT_SOCKET,
+        ocr_config=build_ocr_config(config),
+        max_batch=config['ocr_service_max_batch'],
+        max_latency_ms=config['ocr_service_max_latency_ms'],
+        authkey=config['ocr_service_authkey'] or None
+    )
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("ℹ️  OCR service stopped")
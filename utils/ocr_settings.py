@@ -0,0 +1,117 @@
+"""
+OCR settings from environment variables
+Kept apart from main.load_configuration so the OCR service and batch tools
+can build a DocumentParser config without email or LLM credentials.
+"""
+
+import os
+from dotenv import load_dotenv
+
+
+def load_ocr_settings() -> dict:
+    """Load every OCR_* setting from the environment (and .env), with defaults"""
+    load_dotenv()
+
+    return {
+        'ocr_trocr_backend': os.getenv('OCR_TROCR_BACKEND', 'pytorch').lower(),
+        'ocr_trocr_batch_size': int(os.getenv('OCR_TROCR_BATCH_SIZE', 16)),
+        'ocr_easyocr_batch_size': int(os.getenv('OCR_EASYOCR_BATCH_SIZE', 16)),
+        'ocr_engine_mode': os.getenv('OCR_ENGINE_MODE', 'ensemble').lower(),
+        'ocr_cascade_threshold': float(os.getenv('OCR_CASCADE_THRESHOLD', 0.8)),
+        'ocr_detection_mode': os.getenv('OCR_DETECTION_MODE', 'per_pass').lower(),
+        'ocr_box_match_iou': float(os.getenv('OCR_BOX_MATCH_IOU', 0.85)),
+        'ocr_page_workers': int(os.getenv('OCR_PAGE_WORKERS', 1)),
+        'ocr_worker_torch_threads': int(os.getenv('OCR_WORKER_TORCH_THREADS', 1)),
+        'ocr_initial_dpi': int(os.getenv('OCR_INITIAL_DPI', 200)),
+        'ocr_max_dpi': int(os.getenv('OCR_MAX_DPI', 400)),
+        'ocr_rerender_confidence': float(os.getenv('OCR_RERENDER_CONFIDENCE', 0.6)),
+        'ocr_cache_enabled': os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true',
+        'ocr_cache_path': os.getenv('OCR_CACHE_PATH', './data/ocr_cache'),
+        'ocr_cache_max_mb': float(os.getenv('OCR_CACHE_MAX_MB', 256)),
+        'ocr_debug_images': os.getenv('OCR_DEBUG_IMAGES', 'off').lower(),
+        'ocr_debug_sample_rate': float(os.getenv('OCR_DEBUG_SAMPLE_RATE', 0.1)),
+        'ocr_debug_max_files': int(os.getenv('OCR_DEBUG_MAX_FILES', 50)),
+        'ocr_min_page_text_chars': int(os.getenv('OCR_MIN_PAGE_TEXT_CHARS', 10)),
+        'ocr_early_exit_confidence': float(os.getenv('OCR_EARLY_EXIT_CONFIDENCE', 1.0)),
+        'ocr_parallel_enhancement': os.getenv('OCR_PARALLEL_ENHANCEMENT', 'false').lower() == 'true',
+        'ocr_denoiser': os.getenv('OCR_DENOISER', 'nlm').lower(),
+        'ocr_denoise_strength': int(os.getenv('OCR_DENOISE_STRENGTH', 10)),
+        'ocr_escalation_mode': os.getenv('OCR_ESCALATION_MODE', 'page').lower(),
+        'ocr_region_confidence': float(os.getenv('OCR_REGION_CONFIDENCE', 0.6)),
+        'ocr_box_grouping': os.getenv('OCR_BOX_GROUPING', 'word').lower(),
+        'ocr_line_gap_ratio': float(os.getenv('OCR_LINE_GAP_RATIO', 1.0)),
+        'ocr_layout_templates_enabled': os.getenv('OCR_LAYOUT_TEMPLATES', 'false').lower() == 'true',
+        'ocr_layout_templates_path': os.getenv('OCR_LAYOUT_TEMPLATES_PATH', './data/layout_templates.json'),
+        'ocr_template_min_score': float(os.getenv('OCR_TEMPLATE_MIN_SCORE', 0.7)),
+        'ocr_template_learn_attempts': int(os.getenv('OCR_TEMPLATE_LEARN_ATTEMPTS', 2)),
+        'ocr_languages': [l.strip() for l in os.getenv('OCR_LANGUAGES', 'en').split(',') if l.strip()],
+        'ocr_use_large_model': os.getenv('OCR_USE_LARGE_MODEL', 'true').lower() == 'true',
+        'ocr_max_model_memory_mb': float(os.getenv('OCR_MAX_MODEL_MEMORY_MB', 0)),
+        'ocr_warmup': os.getenv('OCR_WARMUP', 'true').lower() == 'true',
+        'ocr_service_socket': os.getenv('OCR_SERVICE_SOCKET', ''),
+        'ocr_service_max_batch': int(os.getenv('OCR_SERVICE_MAX_BATCH', 32)),
+        'ocr_service_max_latency_ms': float(os.getenv('OCR_SERVICE_MAX_LATENCY_MS', 20)),
+        'ocr_service_connect_timeout': float(os.getenv('OCR_SERVICE_CONNECT_TIMEOUT', 600)),
+        'ocr_service_authkey': os.getenv('OCR_SERVICE_AUTHKEY', ''),
+        'ocr_cpu_budget': int(os.getenv('OCR_CPU_BUDGET', 0)),
+        'ocr_torch_threads': int(os.getenv('OCR_TORCH_THREADS', 0)),
+        'ocr_cv2_threads': int(os.getenv('OCR_CV2_THREADS', 0)),
+        'ocr_max_rss_mb': float(os.getenv('OCR_MAX_RSS_MB', 0)),
+        'ocr_pdf_backend': os.getenv('OCR_PDF_BACKEND', 'auto').lower(),
+        'ocr_pdf_embedded_images': os.getenv('OCR_PDF_EMBEDDED_IMAGES', 'true').lower() == 'true',
+        'ocr_pdf_text_backend': os.getenv('OCR_PDF_TEXT_BACKEND', 'pypdf2').lower(),
+        'ocr_section_label': os.getenv('OCR_SECTION_LABEL', 'Plan ID'),
+        'ocr_stop_labels': [l.strip() for l in os.getenv('OCR_STOP_LABELS', 'Name,Address,Phone,Plan ID').split(',') if l.strip()],
+    }
+
+
+def build_ocr_config(config: dict) -> dict:
+    """DocumentParser OCR config from load_ocr_settings() output (or a config dict containing it)"""
+    return {
+        'trocr_backend': config['ocr_trocr_backend'],
+        'trocr_batch_size': config['ocr_trocr_batch_size'],
+        'easyocr_batch_size': config['ocr_easyocr_batch_size'],
+        'engine_mode': config['ocr_engine_mode'],
+        'cascade_threshold': config['ocr_cascade_threshold'],
+        'detection_mode': config['ocr_detection_mode'],
+        'box_match_iou': config['ocr_box_match_iou'],
+        'page_workers': config['ocr_page_workers'],
+        'worker_torch_threads': config['ocr_worker_torch_threads'],
+        'initial_dpi': config['ocr_initial_dpi'],
+        'max_dpi': config['ocr_max_dpi'],
+        'rerender_confidence': config['ocr_rerender_confidence'],
+        'cache_enabled': config['ocr_cache_enabled'],
+        'cache_path': config['ocr_cache_path'],
+        'cache_max_mb': config['ocr_cache_max_mb'],
+        'debug_images': config['ocr_debug_images'],
+        'debug_sample_rate': config['ocr_debug_sample_rate'],
+        'debug_max_files': config['ocr_debug_max_files'],
+        'min_page_text_chars': config['ocr_min_page_text_chars'],
+        'early_exit_confidence': config['ocr_early_exit_confidence'],
+        'parallel_enhancement': config['ocr_parallel_enhancement'],
+        'denoiser': config['ocr_denoiser'],
+        'denoise_strength': config['ocr_denoise_strength'],
+        'escalation_mode': config['ocr_escalation_mode'],
+        'region_confidence': config['ocr_region_confidence'],
+        'box_grouping': config['ocr_box_grouping'],
+        'line_gap_ratio': config['ocr_line_gap_ratio'],
+        'layout_templates_enabled': config['ocr_layout_templates_enabled'],
+        'layout_templates_path': config['ocr_layout_templates_path'],
+        'template_min_score': config['ocr_template_min_score'],
+        'template_learn_attempts': config['ocr_template_learn_attempts'],
+        'languages': config['ocr_languages'],
+        'use_large_model': config['ocr_use_large_model'],
+        'max_model_memory_mb': config['ocr_max_model_memory_mb'],
+        'service_address': config['ocr_service_socket'] or None,
+        'service_connect_timeout': config['ocr_service_connect_timeout'],
+        'service_authkey': config['ocr_service_authkey'] or None,
+        'cpu_budget': config['ocr_cpu_budget'],
+        'torch_threads': config['ocr_torch_threads'],
+        'cv2_threads': config['ocr_cv2_threads'],
+        'max_rss_mb': config['ocr_max_rss_mb'],
+        'pdf_backend': config['ocr_pdf_backend'],
+        'pdf_embedded_images': config['ocr_pdf_embedded_images'],
+        'pdf_text_backend': config['ocr_pdf_text_backend'],
+        'stop_labels': config['ocr_stop_labels'],
+        'section_label': config['ocr_section_label']
+    }
@@ -7,6 +7,7 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timezone
 from pathlib import Path
 import logging
+from .attachment import Attachment
 
 logger = logging.getLogger(__name__)
 
@@ -135,6 +136,29 @@ class OutlookConnector:
         # Create download directory if it doesn't exist
         Path(download_path).mkdir(parents=True, exist_ok=True)
         
+        for attachment in self.read_attachments(email_message, download_path):
+            # Save attachment
+            with open(attachment.path, 'wb') as f:
+                f.write(attachment.data)
+            
+            downloaded_files.append(attachment.path)
+            logger.info(f"Downloaded attachment: {Path(attachment.path).name}")
+        
+        return downloaded_files
+
+    def read_attachments(self, email_message, download_path: str):
+        """
+        Read all attachments from an email into memory without touching disk
+
+        Args:
+            email_message: Email message object
+            download_path: Directory the attachments are saved to if persisted later
+
+        Returns:
+            List of Attachment objects (path set to '<download_path>/<timestamp>_<filename>')
+        """
+        attachments = []
+
         for part in email_message.walk():
             # Check if part has attachment
             if part.get_content_disposition() == 'attachment':
@@ -142,21 +166,21 @@ class OutlookConnector:
                 if filename:
                     # Generate safe filename with timestamp
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    safe_filename = f"{timestamp}_{filename}"
-                    filepath = os.path.join(download_path, safe_filename)
-                    
-                    # Save attachment
-                    with open(filepath, 'wb') as f:
-                        f.write(part.get_payload(decode=True))
-                    
-                    downloaded_files.append(filepath)
-                    logger.info(f"Downloaded attachment: {safe_filename}")
-        
-        if not downloaded_files:
+                    filepath = os.path.join(download_path, f"{timestamp}_{filename}")
+
+                    attachments.append(Attachment(
+                        name=filename,
+                        data=part.get_payload(decode=True) or b"",
+                        content_type=part.get_content_type(),
+                        path=filepath
+                    ))
+                    logger.info(f"Read attachment: {filename}")
+
+        if not attachments:
             logger.info("No attachments found in email")
-        
-        return downloaded_files
-    
+
+        return attachments
+
     def has_attachments(self, email_message):
         """Check if email has attachments"""
         for part in email_message.walk():
@@ -222,6 +246,24 @@ class OutlookConnector:
         except Exception as e:
             logger.error(f"Error marking email as read: {str(e)}")
     
+    def mark_as_unread(self, email_message) -> bool:
+        """Mark an email as unread again (fetching it set \\Seen) so the next run picks it up"""
+        try:
+            mail = self._connect_imap()
+            mail.select('INBOX')
+            
+            # Remove seen flag
+            mail.store(email_message.email_id, '-FLAGS', '\\Seen')
+            
+            mail.close()
+            mail.logout()
+            
+            logger.info(f"Marked email as unread")
+            return True
+        except Exception as e:
+            logger.error(f"Error marking email as unread: {str(e)}")
+            return False
+    
     def send_email(self, to: str, subject: str, body: str):
         """
         Send a new email
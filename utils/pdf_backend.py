@@ -0,0 +1,151 @@
+import logging
+import numpy as np
+from PIL import Image
+from .attachment import Attachment
+
+logger = logging.getLogger(__name__)
+
+PDF_BACKENDS = ('auto', 'pymupdf', 'pdf2image')
+
+# An embedded image covering at least this share of the page is treated as the page scan
+_FULL_PAGE_COVERAGE = 0.9
+
+
+def _load_pymupdf():
+    try:
+        import pymupdf
+        return pymupdf
+    except ImportError:
+        import fitz  # PyMuPDF < 1.24 only ships the legacy module name
+        return fitz
+
+
+def _open_pymupdf(fitz, source):
+    """Open a path or in-memory Attachment as a PyMuPDF document"""
+    if isinstance(source, Attachment):
+        return fitz.open(stream=source.open(), filetype='pdf')
+    return fitz.open(source)
+
+
+def _pymupdf_available() -> bool:
+    try:
+        _load_pymupdf()
+        return True
+    except ImportError:
+        return False
+
+
+class PDFRasterizer:
+    """
+    Page images for OCR
+    Backends:
+        pymupdf   - in-process rendering into numpy buffers, plus direct extraction of
+                    a page's embedded scan image at its native resolution
+        pdf2image - poppler subprocess rendering (no embedded image extraction)
+        auto      - pymupdf when installed, otherwise pdf2image
+    """
+
+    def __init__(self, backend: str = 'auto', extract_embedded: bool = True, max_dpi: int = None):
+        """
+        Initialize rasterizer
+
+        Args:
+            backend: 'auto', 'pymupdf' or 'pdf2image'
+            extract_embedded: Use a page's single full-page image instead of rendering it
+            max_dpi: Embedded scans above this effective DPI are downscaled to it (None = never)
+        """
+        if backend not in PDF_BACKENDS:
+            logger.warning(f"Unknown PDF backend '{backend}', using 'auto'")
+            backend = 'auto'
+        if backend in ('auto', 'pymupdf') and not _pymupdf_available():
+            if backend == 'pymupdf':
+                logger.warning("PyMuPDF not installed - falling back to pdf2image")
+            backend = 'pdf2image'
+        elif backend == 'auto':
+            backend = 'pymupdf'
+
+        self.backend = backend
+        self.extract_embedded = extract_embedded and backend == 'pymupdf'
+        self.max_dpi = max_dpi
+        logger.info(f"PDF rasterizer: {self.backend}"
+                    f"{' (embedded scan extraction on)' if self.extract_embedded else ''}")
+
+    def page_count(self, filepath) -> int:
+        if self.backend == 'pymupdf':
+            fitz = _load_pymupdf()
+            with _open_pymupdf(fitz, filepath) as doc:
+                return doc.page_count
+
+        if isinstance(filepath, Attachment):
+            from pdf2image import pdfinfo_from_bytes
+            return int(pdfinfo_from_bytes(bytes(filepath.data))['Pages'])
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(filepath)['Pages'])
+
+    def render_page(self, filepath, page_num: int, dpi: int) -> Image.Image:
+        """Rasterize one 1-based page of a path or in-memory Attachment at dpi"""
+        if self.backend == 'pymupdf':
+            fitz = _load_pymupdf()
+            with _open_pymupdf(fitz, filepath) as doc:
+                pix = doc[page_num - 1].get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+                return self._pixmap_to_image(pix)
+
+        if isinstance(filepath, Attachment):
+            from pdf2image import convert_from_bytes
+            return convert_from_bytes(bytes(filepath.data), dpi=dpi, first_page=page_num, last_page=page_num)[0]
+        from pdf2image import convert_from_path
+        return convert_from_path(filepath, dpi=dpi, first_page=page_num, last_page=page_num)[0]
+
+    def embedded_scan(self, filepath, page_num: int) -> Image.Image | None:
+        """
+        The page's scan image at native resolution, if the page is exactly one
+        upright image covering (nearly) the whole page; otherwise None
+        """
+        if not self.extract_embedded:
+            return None
+
+        fitz = _load_pymupdf()
+        try:
+            with _open_pymupdf(fitz, filepath) as doc:
+                page = doc[page_num - 1]
+                images = page.get_images(full=True)
+                if len(images) != 1 or page.rotation:
+                    return None
+
+                xref, smask = images[0][0], images[0][1]
+                placements = page.get_image_rects(xref, transform=True)
+                if smask or len(placements) != 1:
+                    return None
+
+                rect, matrix = placements[0]
+                upright = abs(matrix.b) < 1e-3 and abs(matrix.c) < 1e-3 and matrix.a > 0 and matrix.d > 0
+                page_area = page.rect.width * page.rect.height
+                if not upright or (rect & page.rect).get_area() < _FULL_PAGE_COVERAGE * page_area:
+                    return None
+
+                # Pixmap decodes every PDF image filter (DCT/JPEG, CCITT, Flate, JBIG2...)
+                pix = fitz.Pixmap(doc, xref)
+                if pix.alpha or pix.n not in (1, 3):
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                image = self._pixmap_to_image(pix)
+
+                native_dpi = image.width / (page.rect.width / 72)
+                if self.max_dpi and native_dpi > self.max_dpi:
+                    scale = self.max_dpi / native_dpi
+                    image = image.resize((int(image.width * scale), int(image.height * scale)), Image.LANCZOS)
+                    logger.info(f"Page {page_num}: embedded scan at {native_dpi:.0f} DPI, "
+                                f"downscaled to {self.max_dpi} DPI")
+                else:
+                    logger.info(f"Page {page_num}: using embedded scan at native {native_dpi:.0f} DPI")
+                return image
+        except Exception as e:
+            logger.debug(f"Embedded image extraction failed for page {page_num}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _pixmap_to_image(pix) -> Image.Image:
+        """Wrap a PyMuPDF pixmap's sample buffer as a PIL image without a PNG/PPM round trip"""
+        array = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        if pix.n == 1:
+            array = array[:, :, 0]
+        return Image.fromarray(array)
@@ -0,0 +1,59 @@
+import logging
+from typing import Iterator, Tuple
+import PyPDF2
+from .attachment import open_source
+
+logger = logging.getLogger(__name__)
+
+PDF_TEXT_BACKENDS = ('pypdf2', 'pymupdf')
+
+
+class PyPDF2TextBackend:
+    """Digital text layer via PyPDF2 (default)"""
+
+    name = 'pypdf2'
+
+    def iter_pages(self, filepath) -> Iterator[Tuple[int, int, str]]:
+        """Yield (page_num, page_count, text) one page at a time; stop iterating to skip the rest"""
+        with open_source(filepath) as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            page_count = len(pdf_reader.pages)
+            for i in range(page_count):
+                yield i + 1, page_count, pdf_reader.pages[i].extract_text() or ""
+
+
+class PyMuPDFTextBackend:
+    """Digital text layer via PyMuPDF (optional, considerably faster on long documents)"""
+
+    name = 'pymupdf'
+
+    def iter_pages(self, filepath) -> Iterator[Tuple[int, int, str]]:
+        from .pdf_backend import _load_pymupdf, _open_pymupdf
+        fitz = _load_pymupdf()
+        with _open_pymupdf(fitz, filepath) as doc:
+            for i in range(doc.page_count):
+                yield i + 1, doc.page_count, doc[i].get_text() or ""
+
+
+def get_text_backend(name: str = 'pypdf2'):
+    """Return a text backend by name, falling back to PyPDF2 if it is unknown or not installed"""
+    if name == 'pymupdf':
+        try:
+            from .pdf_backend import _load_pymupdf
+            _load_pymupdf()
+            return PyMuPDFTextBackend()
+        except ImportError:
+            logger.warning("PyMuPDF not installed - using PyPDF2 for PDF text")
+    elif name != 'pypdf2':
+        logger.warning(f"Unknown PDF text backend '{name}', using 'pypdf2'")
+    return PyPDF2TextBackend()
+
+
+def _normalize(text: str) -> str:
+    return ''.join(text.lower().split())
+
+
+def missing_labels(text: str, labels) -> list:
+    """Labels not yet present in text (case- and whitespace-insensitive)"""
+    normalized = _normalize(text)
+    return [label for label in labels if _normalize(label) not in normalized]
@@ -0,0 +1,76 @@
+import gc
+import os
+import logging
+import cv2
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentMemoryExceeded(MemoryError):
+    """Raised when OCR of a document pushes process RSS over the configured ceiling"""
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (0.0 if it cannot be read)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class ResourceGovernor:
+    """
+    CPU thread budgets and memory ceiling for OCR in one process
+    Torch gets the full CPU budget for inference; OpenCV gets half of it since
+    enhancement can run alongside inference. Forked page workers share the budget
+    and are limited to their own torch threads and a single OpenCV thread.
+    """
+
+    def __init__(self, cpu_budget: int = None, torch_threads: int = None, cv2_threads: int = None,
+                 max_rss_mb: float = None):
+        """
+        Initialize governor
+
+        Args:
+            cpu_budget: Cores OCR may use in this process (default: all cores)
+            torch_threads: Torch intra-op threads (default: cpu_budget)
+            cv2_threads: OpenCV threads (default: half of cpu_budget)
+            max_rss_mb: Process RSS at which the document being OCR'd is aborted (None = off)
+        """
+        self.cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+        self.torch_threads = max(1, torch_threads or self.cpu_budget)
+        self.cv2_threads = max(1, cv2_threads or self.cpu_budget // 2)
+        self.max_rss_mb = max_rss_mb or None
+
+    def apply(self):
+        """Set this process's torch and OpenCV thread pools"""
+        torch.set_num_threads(self.torch_threads)
+        cv2.setNumThreads(self.cv2_threads)
+        limit = f", RSS ceiling {self.max_rss_mb:.0f} MB" if self.max_rss_mb else ""
+        logger.info(f"OCR resource budget: {self.torch_threads} torch / {self.cv2_threads} OpenCV "
+                    f"thread(s) of {self.cpu_budget} core(s){limit}")
+
+    @staticmethod
+    def apply_in_worker(torch_threads: int):
+        """Thread limits for a forked page worker (several run side by side)"""
+        torch.set_num_threads(max(1, torch_threads))
+        cv2.setNumThreads(1)
+
+    def check_memory(self, context: str = ""):
+        """Raise DocumentMemoryExceeded if RSS is over the ceiling even after a collection"""
+        if not self.max_rss_mb or current_rss_mb() <= self.max_rss_mb:
+            return
+        gc.collect()
+        rss = current_rss_mb()
+        if rss > self.max_rss_mb:
+            raise DocumentMemoryExceeded(
+                f"RSS {rss:.0f} MB exceeds {self.max_rss_mb:.0f} MB ceiling ({context})"
+            )
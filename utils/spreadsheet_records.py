@@ -0,0 +1,82 @@
+import re
+import logging
+from typing import Dict, List, Iterator, Tuple
+from openpyxl import load_workbook
+from .attachment import readable
+
+logger = logging.getLogger(__name__)
+
+# Common header spellings for each mandatory field (compared after normalization)
+HEADER_ALIASES = {
+    'name': ['full_name', 'client_name', 'member_name', 'plan_holder', 'participant_name'],
+    'address': ['street_address', 'mailing_address', 'postal_address', 'home_address'],
+    'phone_number': ['phone', 'phone_no', 'telephone', 'mobile', 'mobile_number', 'contact_number'],
+    'plan_id': ['plan', 'plan_no', 'plan_number', 'planid'],
+}
+
+# Rows searched for a header before a sheet is treated as unstructured
+_HEADER_SEARCH_ROWS = 10
+
+
+def _normalize_header(value) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', str(value).lower()).strip('_')
+
+
+def _cell_text(value) -> str:
+    """Cell value as text; whole-number floats (IDs, phone numbers) lose their '.0'"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def map_headers(header_row, fields: List[str]) -> Dict[int, str]:
+    """Column index -> field (mandatory fields plus plan_id) for every header cell that names one"""
+    lookup = {}
+    for field in fields:
+        lookup[_normalize_header(field)] = field
+        for alias in HEADER_ALIASES.get(field, []):
+            lookup.setdefault(alias, field)
+
+    columns = {}
+    for index, cell in enumerate(header_row):
+        if cell is None:
+            continue
+        field = lookup.get(_normalize_header(cell))
+        if field and field not in columns.values():
+            columns[index] = field
+    return columns
+
+
+def iter_spreadsheet_records(filepath, fields: List[str]) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Stream one record per data row from every sheet with a recognizable header
+
+    A sheet's header is the first of its top rows naming at least two mandatory
+    fields; sheets without one are skipped. Blank rows are skipped.
+
+    Yields:
+        (record_id, {field: value}) with record_id like 'Sheet1_row5'
+    """
+    wb = load_workbook(readable(filepath), read_only=True, data_only=True)
+    try:
+        for sheet in wb.worksheets:
+            columns = None
+            for row_num, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+                if columns is None:
+                    if row_num > _HEADER_SEARCH_ROWS:
+                        break
+                    mapped = map_headers(row, fields)
+                    if len(mapped) >= min(2, len(fields)):
+                        columns = mapped
+                        logger.info(f"Sheet '{sheet.title}': header on row {row_num} maps "
+                                    f"{', '.join(columns.values())}")
+                    continue
+
+                values = {field: "" for field in fields}
+                for index, field in columns.items():
+                    if index < len(row) and row[index] is not None:
+                        values[field] = _cell_text(row[index])
+                if any(values.values()):
+                    yield f"{sheet.title}_row{row_num}", values
+    finally:
+        wb.close()